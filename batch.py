@@ -0,0 +1,131 @@
+import os
+import json
+import time
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import headless
+import telemetry
+from llm_client import LlmClient, DEFAULT_REQUESTS_PER_MINUTE, DEFAULT_TOKENS_PER_MINUTE
+from util import DiskUtil, LlmUtil, DEFAULT_MODEL
+
+def read_requests(path):
+    requests = []
+    with open(path, "r") as f:
+        for i, line in enumerate(f):
+            line = line.strip()
+            if not line:
+                continue
+            request = json.loads(line)
+            prompt = request.get("prompt") or "\n\n".join(filter(None, [request.get("title"), request.get("body")]))
+            request_id = str(request.get("id") or request.get("request_id") or i)
+            requests.append({"id": request_id, "prompt": prompt})
+    return requests
+
+def _usage(response, key):
+    usage = getattr(response, "usage_metadata", None)
+    return getattr(usage, key, None) if usage else None
+
+class BatchRunner:
+
+    def __init__(self, llm, model, workers, validators, manifest_path):
+        self.llm = llm
+        self.model = model
+        self.system_instructions = DiskUtil.read_system_instructions()
+        self.workers = workers
+        self.validator_pool = headless.create_pool(validators)
+        self.manifest_path = manifest_path
+
+        self.lock = threading.Lock()
+        self.results = []
+
+    def _generate(self, request):
+        name = str(int(time.time())) + "".join(filter(str.isalnum, request["id"] + request["prompt"]))[:80]
+        result = {"id": request["id"], "prompt": request["prompt"], "name": name, "model": self.model, "ok": False}
+
+        start = time.perf_counter()
+        try:
+            chat = LlmUtil.create_new_chat(self.llm, self.system_instructions, self.model)
+            response = chat.send_message(request["prompt"])
+        except Exception as e:
+            result["latency_s"] = time.perf_counter() - start
+            result["error"] = repr(e)
+            telemetry.record_generation(self.model, request["prompt"], name, None, repr(e))
+            return result
+
+        result["latency_s"] = time.perf_counter() - start
+        result["ttft_s"] = response.ttft_s
+        result["input_tokens"] = _usage(response, "prompt_token_count")
+        result["output_tokens"] = _usage(response, "candidates_token_count")
+        result["total_tokens"] = _usage(response, "total_token_count")
+
+        # only dreams that validate reach the catalogue, failures are kept in the manifest alone
+        validation = headless.validate_in(self.validator_pool, name, source=DiskUtil.clean_program(response.text))
+        result.update(validation)
+        if validation["ok"]:
+            DiskUtil.write_program(name, response.text, None, request["prompt"])
+        telemetry.record_generation(self.model, request["prompt"], name, response, "ok" if validation["ok"] else validation["error"])
+        return result
+
+    def _write_manifest(self):
+        latencies = sorted(r["latency_s"] for r in self.results)
+        summary = {
+            "model": self.model,
+            "requests": len(self.results),
+            "passed": sum(r["ok"] for r in self.results),
+            "input_tokens": sum(r.get("input_tokens") or 0 for r in self.results),
+            "output_tokens": sum(r.get("output_tokens") or 0 for r in self.results),
+            "p50_latency_s": latencies[len(latencies) // 2] if latencies else None,
+            "max_latency_s": latencies[-1] if latencies else None,
+            "llm": self.llm.metrics(),
+        }
+
+        tmp = self.manifest_path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump({"summary": summary, "results": self.results}, f, indent=1)
+        os.replace(tmp, self.manifest_path)
+        return summary
+
+    def run(self, requests):
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            futures = {pool.submit(self._generate, r): r for r in requests}
+            for future in as_completed(futures):
+                try:
+                    result = future.result()
+                except Exception as e:
+                    # one request going wrong in an unexpected way is one failed item, not the end of the night
+                    request = futures[future]
+                    result = {"id": request["id"], "prompt": request["prompt"], "model": self.model, "ok": False, "latency_s": 0.0, "error": repr(e)}
+                with self.lock:
+                    self.results.append(result)
+                    # rewritten as we go so an interrupted night still leaves a manifest
+                    self._write_manifest()
+                print("pass" if result["ok"] else "FAIL", "%.1fs" % result["latency_s"], result["id"], result.get("error") or "")
+
+        self.validator_pool.shutdown()
+        return self._write_manifest()
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate dreams for every prompt in a JSONL file.")
+    parser.add_argument("requests", nargs="?", default="requests.jsonl", help="one JSON object per line with a prompt, or a title and body")
+    parser.add_argument("--workers", type=int, default=4, help="concurrent LLM requests")
+    parser.add_argument("--validators", type=int, default=max(1, (os.cpu_count() or 2) - 1), help="processes running headless validation")
+    parser.add_argument("--model", default=DEFAULT_MODEL)
+    parser.add_argument("--llm", default="gemini", help="gemini, or fake[:option=value,...] to benchmark offline")
+    parser.add_argument("--timeout", type=float, default=120, help="seconds before a request is given up")
+    parser.add_argument("--hedge", action="store_true", help="send a duplicate request when one is slower than the recent p95")
+    parser.add_argument("--rpm", type=int, default=DEFAULT_REQUESTS_PER_MINUTE, help="requests per minute quota")
+    parser.add_argument("--tpm", type=int, default=DEFAULT_TOKENS_PER_MINUTE, help="tokens per minute quota")
+    parser.add_argument("--manifest", default=None, help="defaults to batch-<time>.json")
+    args = parser.parse_args()
+
+    manifest = args.manifest or "batch-" + str(int(time.time())) + ".json"
+    llm = LlmClient(LlmUtil.create_client(args.llm, args.timeout), args.rpm, args.tpm, timeout=args.timeout, hedge=args.hedge)
+    runner = BatchRunner(llm, args.model, args.workers, args.validators, manifest)
+    summary = runner.run(read_requests(args.requests))
+    print(json.dumps(summary, indent=1))
+    print("manifest written to", manifest)
+
+if __name__ == "__main__":
+    main()
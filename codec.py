@@ -0,0 +1,70 @@
+import struct
+import numpy as np
+import pygame
+
+KEY_FRAME = 0
+DELTA_FRAME = 1
+
+# kind, byte length of the frame, number of runs; then every run's skip, every run's length, and the run bytes
+HEADER = struct.Struct("<BII")
+# skips and run lengths, as wide as the frame length so a big frame or one long run fits
+RUN = "<u4"
+# zero gaps shorter than this cost less sent as part of a run than as a new one
+MIN_GAP = 4
+
+def pack_bits(lit):
+    return np.packbits(lit)
+
+def pack(surface):
+    # 1 bit a pixel, row by row, lit where the surface is brighter than half
+    return pack_bits(pygame.surfarray.pixels_red(surface).T > 127)
+
+def unpack(bits, size):
+    w, h = size
+    return np.unpackbits(np.frombuffer(bits, np.uint8), count=w * h).reshape(h, w).astype(bool)
+
+def blit(surface, bits):
+    pygame.surfarray.blit_array(surface, unpack(bits, surface.get_size()).T.astype(np.uint32) * 0xFFFFFF)
+
+def to_surface(bits, size):
+    surface = pygame.Surface(size)
+    blit(surface, bits)
+    return surface
+
+def _spans(starts, counts):
+    # the index of every byte in every run, without a python loop
+    offsets = np.cumsum(counts) - counts
+    return np.repeat(starts - offsets, counts) + np.arange(counts.sum())
+
+def encode(bits, previous=None):
+    # a delta is the xor with the frame before, so only the bytes that changed are sent
+    kind = KEY_FRAME if previous is None else DELTA_FRAME
+    delta = bits if previous is None else np.bitwise_xor(bits, previous)
+    changed = np.flatnonzero(delta)
+    if not len(changed):
+        return HEADER.pack(kind, len(bits), 0)
+
+    breaks = np.flatnonzero(np.diff(changed) > MIN_GAP)
+    starts = changed[np.concatenate(([0], breaks + 1))]
+    ends = changed[np.concatenate((breaks, [len(changed) - 1]))] + 1
+    counts = ends - starts
+    skips = starts - np.concatenate(([0], ends[:-1]))
+    return (HEADER.pack(kind, len(bits), len(starts)) + skips.astype(RUN).tobytes() + counts.astype(RUN).tobytes()
+            + delta[_spans(starts, counts)].tobytes())
+
+def decode(data, previous=None):
+    kind, length, runs = HEADER.unpack_from(data)
+    skips = np.frombuffer(data, RUN, runs, HEADER.size).astype(np.int64)
+    counts = np.frombuffer(data, RUN, runs, HEADER.size + 4 * runs).astype(np.int64)
+    literals = np.frombuffer(data, np.uint8, offset=HEADER.size + 8 * runs)
+
+    frame = np.zeros(length, np.uint8) if kind == KEY_FRAME else previous.copy()
+    spans = _spans(np.cumsum(skips + counts) - counts, counts)
+    if kind == KEY_FRAME:
+        frame[spans] = literals
+    else:
+        frame[spans] ^= literals
+    return frame
+
+def is_key_frame(data):
+    return data[0] == KEY_FRAME
@@ -0,0 +1,136 @@
+import ast
+import json
+import os
+from google.genai import types
+
+from llm_client import estimate_tokens
+
+EDIT_INSTRUCTIONS = """
+
+For this request only, do not reply with the whole program. Reply with only a unified diff against your latest program: \
+--- and +++ lines, then @@ hunks with three lines of unchanged context around every change. No other text."""
+
+class DreamChat:
+    """A chat that resends only the latest program plus a short summary of the dreams before it."""
+
+    def __init__(self, llm, model, system_instructions, max_summary_tokens=600, max_program_tokens=12000):
+        self.llm = llm
+        self.model = model
+        self.config = types.GenerateContentConfig(system_instruction=system_instructions)
+        self.max_summary_tokens = max_summary_tokens
+        self.max_program_tokens = max_program_tokens
+
+        self.earlier = []
+        self.latest_prompt = None
+        self.latest_program = None
+
+    def send_message(self, message, cancel=None):
+        contents = self.build_contents(message)
+        response = self.llm.generate_content(self.model, contents, self.config, cancel)
+        self.record(message, response.text)
+        return response
+
+    def send_edit(self, message, cancel=None):
+        # the caller applies the diff and records the result only if it works
+        contents = self.build_contents(message + EDIT_INSTRUCTIONS, compact=False)
+        return self.llm.generate_content(self.model, contents, self.config, cancel)
+
+    def fork(self):
+        fork = DreamChat(self.llm, self.model, None, self.max_summary_tokens, self.max_program_tokens)
+        fork.config = self.config
+        fork.earlier = list(self.earlier)
+        fork.latest_prompt = self.latest_prompt
+        fork.latest_program = self.latest_program
+        return fork
+
+    def adopt(self, fork):
+        self.earlier = fork.earlier
+        self.latest_prompt = fork.latest_prompt
+        self.latest_program = fork.latest_program
+
+    def build_contents(self, message, compact=True):
+        contents = []
+        if self.latest_program is not None:
+            previous = self._summary()
+            previous += self.latest_prompt
+            contents.append(types.Content(role="user", parts=[types.Part(text=previous)]))
+            program = self._compact_program(self.latest_program) if compact else self.latest_program
+            contents.append(types.Content(role="model", parts=[types.Part(text=program)]))
+        contents.append(types.Content(role="user", parts=[types.Part(text=message)]))
+        return contents
+
+    def record(self, message, program):
+        if self.latest_program is not None:
+            self.earlier.append({"prompt": self.latest_prompt, "dream": self._describe(self.latest_program)})
+        self.latest_prompt = message
+        self.latest_program = program
+
+    def _summary(self):
+        if not self.earlier:
+            return ""
+
+        # newest dreams are kept first when the budget runs out
+        lines = []
+        tokens = 0
+        for turn in reversed(self.earlier):
+            line = '- "' + turn["prompt"] + '"' + (": " + turn["dream"] if turn["dream"] else "")
+            tokens += estimate_tokens(line)
+            if tokens > self.max_summary_tokens:
+                break
+            lines.append(line)
+
+        omitted = len(self.earlier) - len(lines)
+        header = "Earlier in this session you dreamed these, oldest first"
+        if omitted:
+            header += " (" + str(omitted) + " older dreams not shown)"
+        return header + ":\n" + "\n".join(reversed(lines)) + "\n\nThen I asked:\n"
+
+    def _describe(self, program):
+        # the instructions and next ideas say what a dream was in a few tokens
+        try:
+            tree = ast.parse(program.replace('```python', '').replace('```', ''))
+        except SyntaxError:
+            return ""
+
+        parts = []
+        for node in ast.walk(tree):
+            if isinstance(node, ast.FunctionDef) and node.name in {"get_instructions", "get_next_idea"}:
+                for r in ast.walk(node):
+                    if isinstance(r, ast.Return) and r.value is not None:
+                        try:
+                            parts.append(str(ast.literal_eval(r.value)))
+                        except ValueError:
+                            pass
+                        break
+        return " ".join(parts)
+
+    def _compact_program(self, program):
+        if estimate_tokens(program) <= self.max_program_tokens:
+            return program
+
+        # comments and blank lines are the only part we can drop without breaking the program
+        lines = [l for l in program.splitlines() if l.strip() and not l.strip().startswith("#")]
+        return "\n".join(lines)
+
+    def save(self, path, program_name=None):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        session = {
+            "model": self.model,
+            "earlier": self.earlier,
+            "latest_prompt": self.latest_prompt,
+            "latest_program": self.latest_program,
+            "program_name": program_name,
+        }
+        tmp = path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(session, f, indent=1)
+        os.replace(tmp, path)
+
+    def load(self, path):
+        with open(path, "r") as f:
+            session = json.load(f)
+        self.model = session["model"]
+        self.earlier = session["earlier"]
+        self.latest_prompt = session["latest_prompt"]
+        self.latest_program = session["latest_program"]
+        return session["program_name"]
@@ -0,0 +1,131 @@
+import re
+import time
+import difflib
+import random
+import threading
+import httpx
+from google.genai import errors
+
+from llm_client import estimate_tokens
+from util import DiskUtil
+
+HEADER = 'import math\nimport random\nfrom generated.helpers import Render, Input, Sound\n\n'
+
+class FakeUsage:
+
+    def __init__(self, prompt_token_count, candidates_token_count):
+        self.prompt_token_count = prompt_token_count
+        self.candidates_token_count = candidates_token_count
+        self.total_token_count = prompt_token_count + candidates_token_count
+
+class FakeChunk:
+
+    def __init__(self, text, usage_metadata=None):
+        self.text = text
+        self.usage_metadata = usage_metadata
+
+class FakeModels:
+
+    def __init__(self, client):
+        self.client = client
+
+    def generate_content_stream(self, model, contents, config):
+        return self.client.stream(contents, config)
+
+    def generate_content(self, model, contents, config):
+        chunks = list(self.client.stream(contents, config))
+        return FakeChunk("".join(c.text for c in chunks), chunks[-1].usage_metadata)
+
+class FakeClient:
+    """Stands in for genai.Client, answering from the saved dreams with made up latency and errors."""
+
+    def __init__(self, ttft=0.8, sigma=0.5, tokens_per_second=150, chunk_tokens=64, error_rate=0.0, midstream_error_rate=0.0,
+                 hang_rate=0.0, hang_seconds=600, mutate=True, seed=None, timeout=None):
+        self.ttft = ttft
+        self.sigma = sigma
+        self.tokens_per_second = tokens_per_second
+        self.chunk_tokens = chunk_tokens
+        self.error_rate = error_rate
+        self.midstream_error_rate = midstream_error_rate
+        self.hang_rate = hang_rate
+        self.hang_seconds = hang_seconds
+        self.mutate = mutate
+        self.timeout = timeout
+
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.corpus = [n for n in DiskUtil.get_saved_program_names()]
+        self.sources = {}
+        self.models = FakeModels(self)
+
+    def _source(self, name):
+        if name not in self.sources:
+            self.sources[name] = DiskUtil.read_program(name).replace(HEADER, "", 1)
+        return self.sources[name]
+
+    def _mutate(self, source, rng):
+        # nudges numeric literals so repeated prompts don't return identical programs
+        def nudge(match):
+            if rng.random() > 0.1:
+                return match.group(0)
+            value = match.group(0)
+            if "." in value:
+                return repr(round(float(value) * rng.uniform(0.8, 1.25), 3))
+            return str(max(1, int(int(value) * rng.uniform(0.8, 1.25))))
+        return re.sub(r"(?<![\w.])\d+(\.\d+)?(?![\w.])", nudge, source)
+
+    def _error(self, rng):
+        if rng.random() < 0.5:
+            return errors.ClientError(429, {"error": {"code": 429, "message": "fake quota exhausted", "status": "RESOURCE_EXHAUSTED"}})
+        code = rng.choice([500, 503])
+        return errors.ServerError(code, {"error": {"code": code, "message": "fake server error", "status": "UNAVAILABLE"}})
+
+    def stream(self, contents, config):
+        with self.lock:
+            # each request gets its own generator so concurrent streams stay reproducible with a seed
+            rng = random.Random(self.random.random())
+
+        prompt_tokens = sum(estimate_tokens(p.text) for c in contents for p in c.parts)
+        prompt_tokens += estimate_tokens(getattr(config, "system_instruction", None) or "")
+        roll = rng.random()
+        if roll < self.hang_rate:
+            # behaves like the real client, whose reads give up after its http timeout
+            if self.timeout and self.timeout < self.hang_seconds:
+                time.sleep(self.timeout)
+                raise httpx.ReadTimeout("fake read timeout")
+            time.sleep(self.hang_seconds)
+        time.sleep(rng.lognormvariate(0, self.sigma) * self.ttft)
+        if roll < self.hang_rate + self.error_rate:
+            raise self._error(rng)
+
+        previous = [c.parts[0].text for c in contents if c.role == "model"]
+        if previous and "unified diff" in contents[-1].parts[0].text:
+            # edit requests get a diff of a nudged copy of the program they refer to
+            edited = self._mutate(previous[-1], rng)
+            text = "".join(difflib.unified_diff(previous[-1].splitlines(True), edited.splitlines(True), "program.py", "program.py"))
+        else:
+            text = self._source(rng.choice(self.corpus))
+            if self.mutate:
+                text = self._mutate(text, rng)
+
+        chunk_chars = self.chunk_tokens * 4
+        fail_at = len(text) * rng.random() if rng.random() < self.midstream_error_rate else None
+        for i in range(0, len(text), chunk_chars):
+            if fail_at is not None and i >= fail_at:
+                raise self._error(rng)
+            yield FakeChunk(text[i:i + chunk_chars])
+            time.sleep(self.chunk_tokens / self.tokens_per_second)
+
+        yield FakeChunk("", FakeUsage(prompt_tokens, estimate_tokens(text)))
+
+def parse_spec(spec):
+    # "fake:ttft=0.5,error_rate=0.1" -> {"ttft": 0.5, "error_rate": 0.1}
+    params = {}
+    _, _, options = spec.partition(":")
+    for option in filter(None, options.split(",")):
+        key, _, value = option.partition("=")
+        if value.lower() in {"true", "false"}:
+            params[key] = value.lower() == "true"
+        else:
+            params[key] = float(value) if "." in value or "e" in value else int(value)
+    return params
@@ -0,0 +1,212 @@
+import os
+import math
+import signal
+import time
+import struct
+import traceback
+import multiprocessing
+from multiprocessing import shared_memory
+from concurrent.futures import wait
+import pygame
+
+import codec
+import headless
+from generated.helpers import Render, context_of
+
+# the first byte tells workers to stop, then each tile is a frame counter and its packed frame
+CONTROL = struct.Struct("<B7x")
+SEQUENCE = struct.Struct("<I")
+
+def play_tiles(shm_name, tiles, factor, slot_size, max_fps, window_pid):
+    # runs in a worker, taking turns drawing each of its dreams until the page is closed or the window is gone
+    shm = shared_memory.SharedMemory(shm_name)
+    try:
+        programs = {}
+        for slot, name in tiles:
+            try:
+                programs[slot] = headless.load_program(name)
+            except Exception:
+                # the tile stays dark
+                traceback.print_exc()
+
+        last = time.perf_counter()
+        while not CONTROL.unpack_from(shm.buf, 0)[0] and os.getppid() == window_pid:
+            start = time.perf_counter()
+            dt = start - last
+            last = start
+            for slot, program in list(programs.items()):
+                try:
+                    with context_of(program) as context:
+                        Render.clear_screen()
+                        program.update(dt)
+                        program.draw()
+                except Exception:
+                    traceback.print_exc()
+                    del programs[slot]
+                    continue
+
+                bits = codec.pack_bits(headless.downscale_bits(context.screen, factor)).tobytes()
+                offset = CONTROL.size + slot * slot_size
+                sequence = SEQUENCE.unpack_from(shm.buf, offset)[0]
+                # odd while the frame is being written, so the window never shows half of one
+                SEQUENCE.pack_into(shm.buf, offset, sequence + 1)
+                shm.buf[offset + SEQUENCE.size:offset + SEQUENCE.size + len(bits)] = bits
+                SEQUENCE.pack_into(shm.buf, offset, sequence + 2)
+
+            # fewer tiles a worker, or a faster core, plays them at a higher rate
+            time.sleep(max(0.001, 1 / max_fps - (time.perf_counter() - start)))
+    finally:
+        shm.close()
+
+class Gallery:
+    """Plays a page of saved dreams at once as live tiles, each running headless in a worker process."""
+
+    def __init__(self, rect, font, names, pool, columns=4, rows=4, factor=2, max_fps=30, stop_timeout=2):
+        self.rect = rect
+        self.font = font
+        self.names = names
+        self.pool = pool
+        self.columns = columns
+        self.rows = rows
+        self.factor = factor
+        self.max_fps = max_fps
+        self.stop_timeout = stop_timeout
+
+        self.tile_size = (headless.PROGRAM_SIZE[0] // factor, headless.PROGRAM_SIZE[1] // factor)
+        self.per_page = columns * rows
+        self.pages = max(1, math.ceil(len(names) / self.per_page))
+        self.frame_bytes = math.ceil(self.tile_size[0] * self.tile_size[1] / 8)
+        self.slot_size = SEQUENCE.size + self.frame_bytes
+        self.shm = shared_memory.SharedMemory(create=True, size=CONTROL.size + self.slot_size * self.per_page)
+
+        self.surf = pygame.Surface(rect.size)
+        self.tiles = [pygame.Surface(self.tile_size) for _ in range(self.per_page)]
+        self.footer_y = rows * self.tile_size[1] + 5
+        self.hovered_tile = None
+        self.futures = []
+        self.page = 0
+        self._start_page()
+
+    def _page_names(self):
+        return self.names[self.page * self.per_page:(self.page + 1) * self.per_page]
+
+    def _start_page(self):
+        self._stop_page()
+        self.shm.buf[:] = bytes(len(self.shm.buf))
+        self.sequences = [0] * self.per_page
+        for tile in self.tiles:
+            tile.fill((0, 0, 0))
+
+        # tiles are dealt out so every worker has about the same number
+        groups = [[] for _ in range(self.pool.workers)]
+        for slot, name in enumerate(self._page_names()):
+            groups[slot % self.pool.workers].append((slot, name))
+        self.futures = [self.pool.submit(play_tiles, self.shm.name, g, self.factor, self.slot_size, self.max_fps, os.getpid()) for g in groups if g]
+
+        page = "page " + str(self.page + 1) + "/" + str(self.pages) + ", left and right to browse, click to play"
+        self.footer_surf = self.font.render(page, False, (255, 255, 255))
+
+    def _stop_page(self):
+        CONTROL.pack_into(self.shm.buf, 0, 1)
+        _, stuck = wait(self.futures, self.stop_timeout)
+        if stuck:
+            # a dream hung in its import, update or draw never sees the stop flag
+            self.pool.kill()
+            self.pool = TilePool(self.pool.workers)
+        self.futures = []
+
+    def _read_tile(self, slot):
+        offset = CONTROL.size + slot * self.slot_size
+        sequence = SEQUENCE.unpack_from(self.shm.buf, offset)[0]
+        if sequence % 2 or sequence == self.sequences[slot]:
+            return
+
+        data = bytes(self.shm.buf[offset + SEQUENCE.size:offset + self.slot_size])
+        if SEQUENCE.unpack_from(self.shm.buf, offset)[0] != sequence:
+            # overwritten while copying, the next frame will do
+            return
+        self.sequences[slot] = sequence
+        codec.blit(self.tiles[slot], data)
+
+    def _tile_rect(self, slot):
+        w, h = self.tile_size
+        return pygame.Rect(slot % self.columns * w, slot // self.columns * h, w, h)
+
+    def draw(self, surface):
+        self.surf.fill((0, 0, 0))
+        names = self._page_names()
+        for slot in range(len(names)):
+            self._read_tile(slot)
+            tile_rect = self._tile_rect(slot)
+            self.surf.blit(self.tiles[slot], tile_rect)
+            if slot == self.hovered_tile:
+                pygame.draw.rect(self.surf, (255, 255, 255), tile_rect, 1)
+
+        if self.hovered_tile is not None and self.hovered_tile < len(names):
+            self.surf.blit(self.font.render(names[self.hovered_tile], False, (255, 255, 255)), (5, self.footer_y))
+        else:
+            self.surf.blit(self.footer_surf, (5, self.footer_y))
+
+        surface.blit(self.surf, self.rect)
+
+    def _tile_at(self, pos):
+        for slot in range(len(self._page_names())):
+            if self._tile_rect(slot).collidepoint(pos[0] - self.rect.x, pos[1] - self.rect.y):
+                return slot
+        return None
+
+    def _turn_page(self, step):
+        page = min(max(0, self.page + step), self.pages - 1)
+        if page != self.page:
+            self.page = page
+            self._start_page()
+
+    def handle_event(self, event):
+        if event.type == pygame.MOUSEMOTION:
+            self.hovered_tile = self._tile_at(event.pos)
+        elif event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
+            slot = self._tile_at(event.pos)
+            if slot is not None:
+                return self._page_names()[slot]
+        elif event.type == pygame.MOUSEWHEEL:
+            self._turn_page(-event.y)
+        elif event.type == pygame.KEYDOWN:
+            if event.key in (pygame.K_RIGHT, pygame.K_PAGEDOWN):
+                self._turn_page(1)
+            elif event.key in (pygame.K_LEFT, pygame.K_PAGEUP):
+                self._turn_page(-1)
+        return None
+
+    def close(self):
+        self._stop_page()
+        self.shm.close()
+        self.shm.unlink()
+
+class TilePool:
+    """The gallery's worker processes, which knows their pids so a dream hung in one can be stopped by killing them."""
+
+    def __init__(self, workers=None):
+        # one core is left for the window
+        self.workers = workers or max(1, (os.cpu_count() or 2) - 1)
+        self.pids = multiprocessing.get_context("spawn").SimpleQueue()
+        self.executor = headless.create_pool(self.workers, self.pids)
+
+    def submit(self, fn, *args):
+        return self.executor.submit(fn, *args)
+
+    def kill(self):
+        # there is no public way to stop a worker in the middle of a task
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        pids = set()
+        while not self.pids.empty():
+            pids.add(self.pids.get())
+        for pid in pids:
+            try:
+                # pygame turns a terminate into a quit event the stuck dream never reads
+                os.kill(pid, getattr(signal, "SIGKILL", signal.SIGTERM))
+            except OSError:
+                # already gone
+                pass
+
+    def shutdown(self, cancel_futures=False):
+        self.executor.shutdown(cancel_futures=cancel_futures)
@@ -1,46 +1,107 @@
 import pygame
 import numpy as np
+import contextvars
 from collections import defaultdict
 
-class Render:
-    screen = pygame.Surface((400, 300))
-    font = None
+import timeline
+
+class DreamContext:
+    """The screen, keys and sound switch of one program, so several can share a process."""
+
+    def __init__(self, size=(400, 300), muted=False):
+        self.screen = pygame.Surface(size)
+        self.font = None
+        self.key_pressed = defaultdict(bool)
+        self.muted = muted
+        # counted for the performance overlay, which clears them every frame
+        self.render_calls = defaultdict(int)
+        self.tokens = []
+
+    def __enter__(self):
+        self.tokens.append(_current.set(self))
+        return self
+
+    def __exit__(self, *exc):
+        _current.reset(self.tokens.pop())
+
+# whatever runs outside a program's context, like the window and older callers, shares this one
+_default = DreamContext()
+_current = contextvars.ContextVar("dream_context", default=_default)
+
+def current_context():
+    return _current.get()
+
+def create_program(program_class, context=None):
+    # a program keeps the context it was created in for every later call
+    context = context or DreamContext()
+    with context:
+        program = program_class()
+    program._dream_context = context
+    return program
+
+def context_of(program):
+    return getattr(program, "_dream_context", _default)
+
+def _context_attribute(name):
+    return property(lambda cls: getattr(_current.get(), name), lambda cls, value: setattr(_current.get(), name, value))
+
+class _RenderType(type):
+    screen = _context_attribute("screen")
+    font = _context_attribute("font")
+
+class _InputType(type):
+    key_pressed = _context_attribute("key_pressed")
+
+class Render(metaclass=_RenderType):
 
     def draw_text(text, x, y):
-        if not Render.font:
-            Render.font = pygame.font.Font(None, 16)
-        surf = Render.font.render(text, False, (255, 255, 255))
-        Render.screen.blit(surf, (x, y))
+        context = _current.get()
+        context.render_calls["text"] += 1
+        if not context.font:
+            context.font = pygame.font.Font(None, 16)
+        surf = context.font.render(text, False, (255, 255, 255))
+        context.screen.blit(surf, (x, y))
 
     def draw_rect(x, y, w, h, filled=False):
-        pygame.draw.rect(Render.screen, (255, 255, 255), (x, y, w, h), 0 if filled else 1)
+        context = _current.get()
+        context.render_calls["rect"] += 1
+        pygame.draw.rect(context.screen, (255, 255, 255), (x, y, w, h), 0 if filled else 1)
 
     def draw_circle(x, y, radius, filled=False):
-        pygame.draw.circle(Render.screen, (255, 255, 255), (x, y), radius, 0 if filled else 1)
+        context = _current.get()
+        context.render_calls["circle"] += 1
+        pygame.draw.circle(context.screen, (255, 255, 255), (x, y), radius, 0 if filled else 1)
 
     def draw_line(x1, y1, x2, y2):
-        pygame.draw.line(Render.screen, (255, 255, 255), (x1, y1), (x2, y2))
+        context = _current.get()
+        context.render_calls["line"] += 1
+        pygame.draw.line(context.screen, (255, 255, 255), (x1, y1), (x2, y2))
 
     def turn_on_pixel(x, y):
-        Render.screen.set_at((int(x), int(y)), (255, 255, 255))
+        context = _current.get()
+        context.render_calls["pixel"] += 1
+        context.screen.set_at((int(x), int(y)), (255, 255, 255))
 
     def clear_screen():
-        Render.screen.fill((0, 0, 0))
+        _current.get().screen.fill((0, 0, 0))
 
-class Input:
-    key_pressed = defaultdict(bool)
+class Input(metaclass=_InputType):
 
     def is_key_pressed(key):
-        return Input.key_pressed[key]
+        return _current.get().key_pressed[key]
 
     def key_down(key):
-        Input.key_pressed[key] = True
+        _current.get().key_pressed[key] = True
 
     def key_up(key):
-        if key in Input.key_pressed:
-            del Input.key_pressed[key]
+        key_pressed = _current.get().key_pressed
+        if key in key_pressed:
+            del key_pressed[key]
 
 class Sound:
+    # muted for the whole process, a context can also be muted on its own
+    muted = False
+
     def _generate_tone(frequency, duration, sample_rate=44100, volume=0.1):
         """Generates a sine wave tone as a numpy array of signed 16-bit integers."""
         n_samples = int(round(duration * sample_rate))
@@ -55,6 +116,10 @@ class Sound:
         return samples
 
     def play_tone(frequency, duration):
-        sound = pygame.mixer.Sound(buffer=Sound._generate_tone(frequency, duration))
+        if Sound.muted or _current.get().muted:
+            return
+
+        with timeline.span("tone", "sound", frequency=frequency, duration=duration):
+            sound = pygame.mixer.Sound(buffer=Sound._generate_tone(frequency, duration))
 
-        sound.play()
\ No newline at end of file
+            sound.play()
\ No newline at end of file
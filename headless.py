@@ -0,0 +1,163 @@
+import os
+import ast
+import time
+import types
+import signal
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import importlib
+import linecache
+import threading
+import traceback
+import contextlib
+import pygame
+
+import codec
+import lineage
+from generated.helpers import Render, Sound, create_program, context_of
+from util import DiskUtil
+
+PROGRAM_SIZE = (400, 300)
+ALLOWED_IMPORTS = {"math", "random", "generated.helpers"}
+REQUIRED_METHODS = {"update", "draw", "get_instructions", "get_next_idea"}
+# time on top of the wall limit for a worker to start and report back
+VALIDATION_GRACE = 30
+
+def init(pids=None):
+    # runs in worker processes, never in the window process
+    if pids is not None:
+        # whoever owns the pool can kill a worker stuck in a dream
+        pids.put(os.getpid())
+    os.environ["SDL_VIDEODRIVER"] = "dummy"
+    os.environ["SDL_AUDIODRIVER"] = "dummy"
+    pygame.init()
+    Sound.muted = True
+    lineage.get_store()
+
+def create_pool(workers=None, pids=None):
+    # spawn so workers never inherit the window's display, one core is left for the window by default
+    workers = workers or max(1, (os.cpu_count() or 2) - 1)
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"), initializer=init, initargs=(pids,))
+
+def load_program(name, source=None):
+    if source is None:
+        module = importlib.import_module("generated." + name)
+    else:
+        # candidates are tried before anything is written to disk
+        module = types.ModuleType("generated." + name)
+        module.__file__ = "candidates/" + name + ".py"
+        linecache.cache[module.__file__] = (len(source), None, source.splitlines(True), module.__file__)
+        exec(compile(source, module.__file__, "exec"), module.__dict__)
+    return create_program(module.Program)
+
+class WallLimitExceeded(Exception):
+    pass
+
+@contextlib.contextmanager
+def wall_alarm(seconds):
+    # run_program checks the wall limit between frames, an alarm a second after it also stops an import, __init__ or frame
+    # that never returns; signals only reach the main thread and only where there is setitimer, elsewhere the caller's timeout has to do
+    if not seconds or not hasattr(signal, "setitimer") or threading.current_thread() is not threading.main_thread():
+        yield
+        return
+
+    def expire(signum, frame):
+        raise WallLimitExceeded("ran past the " + str(seconds) + "s wall limit")
+
+    previous = signal.signal(signal.SIGALRM, expire)
+    signal.setitimer(signal.ITIMER_REAL, seconds + 1)
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+
+def run_program(program, seconds, fps=60, wall_limit=None, frame_times=None):
+    dt = 1 / fps
+    start = time.perf_counter()
+    with context_of(program) as context:
+        for _ in range(int(seconds * fps)):
+            frame_start = time.perf_counter()
+            Render.clear_screen()
+            program.update(dt)
+            program.draw()
+            now = time.perf_counter()
+            if frame_times is not None:
+                frame_times.append(now - frame_start)
+            if wall_limit and now - start > wall_limit:
+                break
+    return context.screen
+
+def check_source(source):
+    # the rules from prompt.txt that can be checked without running anything
+    tree = ast.parse(source)
+    problems = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            problems.extend("imports " + a.name for a in node.names if a.name not in ALLOWED_IMPORTS)
+        elif isinstance(node, ast.ImportFrom) and node.module not in ALLOWED_IMPORTS:
+            problems.append("imports " + str(node.module))
+        elif isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id in {"exec", "eval"}:
+            problems.append("calls " + node.func.id + " on line " + str(node.lineno))
+
+    programs = [n for n in tree.body if isinstance(n, ast.ClassDef) and n.name == "Program"]
+    if not programs:
+        problems.append("no Program class")
+    else:
+        methods = {n.name for n in programs[-1].body if isinstance(n, ast.FunctionDef)}
+        problems.extend("Program has no " + m for m in sorted(REQUIRED_METHODS - methods))
+    return problems
+
+def validate_program(name, seconds=2, wall_limit=10, source=None):
+    result = {"ok": False, "error": None, "line": None, "frame_ms": None, "max_frame_ms": None}
+    try:
+        problems = check_source(source or DiskUtil.read_program(name))
+        if problems:
+            result["error"] = "; ".join(problems)
+            return result
+
+        frame_times = []
+        with wall_alarm(wall_limit):
+            program = load_program(name, source)
+            run_program(program, seconds, wall_limit=wall_limit, frame_times=frame_times)
+        if not isinstance(program.get_instructions(), str) or not isinstance(program.get_next_idea(), list):
+            result["error"] = "get_instructions or get_next_idea returned the wrong type"
+            return result
+
+        result["ok"] = True
+        result["frame_ms"] = 1000 * sum(frame_times) / len(frame_times)
+        result["max_frame_ms"] = 1000 * max(frame_times)
+    except BaseException as e:
+        # exit() and quit() raise SystemExit, which would otherwise take the worker down with it
+        result["error"] = repr(e)
+        frames = [f for f in traceback.extract_tb(e.__traceback__) if f.filename.endswith(name + ".py")]
+        if isinstance(e, SyntaxError):
+            result["line"] = e.lineno
+        elif frames:
+            result["line"] = frames[-1].lineno
+    return result
+
+def validate_in(pool, name, seconds=2, wall_limit=10, source=None, timeout=None):
+    # a dream that hangs its worker or breaks the pool fails validation, rather than stalling or crashing whoever asked
+    timeout = timeout or wall_limit + VALIDATION_GRACE
+    try:
+        return pool.submit(validate_program, name, seconds, wall_limit, source).result(timeout)
+    except TimeoutError:
+        return {"ok": False, "error": "validation took over " + str(timeout) + "s", "line": None, "frame_ms": None, "max_frame_ms": None}
+    except Exception as e:
+        traceback.print_exc()
+        return {"ok": False, "error": repr(e), "line": None, "frame_ms": None, "max_frame_ms": None}
+
+def downscale_bits(surface, factor):
+    # a block is lit when a quarter of it is lit, so one pixel lines survive
+    lit = pygame.surfarray.array_red(surface).T > 127
+    h, w = lit.shape[0] // factor, lit.shape[1] // factor
+    blocks = lit[:h * factor, :w * factor].reshape(h, factor, w, factor)
+    return blocks.mean(axis=(1, 3)) >= 0.25
+
+def capture_thumbnail(name, seconds=3, factor=4, wall_limit=5):
+    with wall_alarm(wall_limit):
+        program = load_program(name)
+        surface = run_program(program, seconds, wall_limit=wall_limit)
+    bits = downscale_bits(surface, factor)
+    return bits.shape[1], bits.shape[0], codec.pack_bits(bits).tobytes()
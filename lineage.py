@@ -0,0 +1,262 @@
+import os
+import sys
+import json
+import time
+import zlib
+import difflib
+import hashlib
+import linecache
+import threading
+import contextlib
+import importlib.abc
+import importlib.util
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+    import msvcrt
+
+# every this many deltas a revision is stored whole, bounding materialize cost
+KEYFRAME_INTERVAL = 16
+
+class LineageStore:
+
+    def __init__(self, directory="lineage", cache_size=32):
+        self.directory = Path(directory)
+        self.objects = self.directory / "objects"
+        self.index_path = self.directory / "index.json"
+        self.lock_path = self.directory / "index.lock"
+        self.cache_size = cache_size
+
+        self.lock = threading.Lock()
+        self.cache = {}
+        self.index_mtime = None
+        self._load_index()
+
+    def _read_index(self):
+        if self.index_path.exists():
+            self.index_mtime = self.index_path.stat().st_mtime_ns
+            with open(self.index_path, "r") as f:
+                return json.load(f)
+        return {"dreams": {}, "revisions": {}}
+
+    def _load_index(self):
+        index = self._read_index()
+        self.dreams = index["dreams"]
+        self.revisions = index["revisions"]
+
+    def _merge_index(self):
+        # what another process wrote since we last looked wins, anything only we know about is kept
+        index = self._read_index()
+        self.dreams = {**self.dreams, **index["dreams"]}
+        self.revisions = {**self.revisions, **index["revisions"]}
+
+    @contextlib.contextmanager
+    def _index_lock(self):
+        # the app and batch runs record into the same store, only one of them may read, change and write the index at a time
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with open(self.lock_path, "a+b") as f:
+            if fcntl:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+            try:
+                yield
+            finally:
+                if fcntl:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+                else:
+                    f.seek(0)
+                    msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+    def _save_index(self):
+        self.objects.mkdir(parents=True, exist_ok=True)
+        tmp = self.index_path.with_suffix(".tmp")
+        with open(tmp, "w") as f:
+            json.dump({"dreams": self.dreams, "revisions": self.revisions}, f, indent=1)
+        os.replace(tmp, self.index_path)
+        self.index_mtime = self.index_path.stat().st_mtime_ns
+
+    def refresh(self):
+        # other processes (the app, batch runs) may have recorded new dreams
+        with self.lock:
+            if self.index_path.exists() and self.index_path.stat().st_mtime_ns != self.index_mtime:
+                self._merge_index()
+
+    def has(self, name):
+        return name in self.dreams
+
+    def revision_of(self, name):
+        return self.dreams[name]["rev"]
+
+    def get_names(self):
+        return list(self.dreams)
+
+    def parent_of(self, name):
+        return self.dreams[name]["parent"]
+
+    def ancestry(self, name):
+        names = []
+        while name is not None and self.has(name):
+            names.append(name)
+            name = self.parent_of(name)
+        return names
+
+    def record(self, name, text, parent_name=None, prompt=None):
+        with self.lock, self._index_lock():
+            self._merge_index()
+            rev = hashlib.sha1(text.encode()).hexdigest()[:16]
+            if parent_name not in self.dreams:
+                parent_name = None
+
+            if rev not in self.revisions:
+                base = self.dreams[parent_name]["rev"] if parent_name else None
+                depth = self.revisions[base]["depth"] + 1 if base else 0
+                if depth >= KEYFRAME_INTERVAL:
+                    base, depth = None, 0
+
+                ops = self._diff(self._materialize(base), text) if base else [text]
+                self.objects.mkdir(parents=True, exist_ok=True)
+                tmp = self.objects / (rev + ".tmp" + str(os.getpid()))
+                with open(tmp, "wb") as f:
+                    f.write(zlib.compress(json.dumps(ops).encode(), 9))
+                os.replace(tmp, self.objects / (rev + ".z"))
+
+                self.revisions[rev] = {"base": base, "depth": depth}
+
+            self.dreams[name] = {"rev": rev, "parent": parent_name, "prompt": prompt, "time": int(time.time())}
+            self._save_index()
+            return rev
+
+    def materialize(self, name):
+        self.refresh()
+        with self.lock:
+            return self._materialize(self.dreams[name]["rev"])
+
+    def _materialize(self, rev):
+        if rev in self.cache:
+            return self.cache[rev]
+
+        # walk back to the nearest full revision, then replay deltas forward
+        chain = []
+        while rev is not None and rev not in self.cache:
+            chain.append(rev)
+            rev = self.revisions[rev]["base"]
+        text = self.cache[rev] if rev is not None else None
+
+        for rev in reversed(chain):
+            with open(self.objects / (rev + ".z"), "rb") as f:
+                ops = json.loads(zlib.decompress(f.read()))
+            text = self._apply(text, ops)
+            self.cache[rev] = text
+
+        while len(self.cache) > self.cache_size:
+            del self.cache[next(iter(self.cache))]
+        return text
+
+    def _diff(self, parent_text, text):
+        parent_lines = parent_text.splitlines(True)
+        lines = text.splitlines(True)
+
+        ops = []
+        matcher = difflib.SequenceMatcher(None, parent_lines, lines, autojunk=False)
+        for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+            if tag == "equal":
+                ops.append([i1, i2])
+            elif j2 > j1:
+                ops.append("".join(lines[j1:j2]))
+        return ops
+
+    def _apply(self, parent_text, ops):
+        parent_lines = parent_text.splitlines(True) if parent_text else []
+
+        out = []
+        for op in ops:
+            if isinstance(op, str):
+                out.append(op)
+            else:
+                out.extend(parent_lines[op[0]:op[1]])
+        return "".join(out)
+
+    def disk_usage(self):
+        return sum(f.stat().st_size for f in self.objects.glob("*.z"))
+
+class LineageFinder(importlib.abc.MetaPathFinder, importlib.abc.Loader):
+    """Imports generated.<name> from the lineage store when there is no file for it."""
+
+    def __init__(self, store, package="generated"):
+        self.store = store
+        self.prefix = package + "."
+
+    def find_spec(self, fullname, path, target=None):
+        if not fullname.startswith(self.prefix):
+            return None
+
+        name = fullname[len(self.prefix):]
+        if not self.store.has(name):
+            self.store.refresh()
+            if not self.store.has(name):
+                return None
+
+        return importlib.util.spec_from_loader(fullname, self, origin=str(self.store.directory / (name + ".py")))
+
+    def create_module(self, spec):
+        return None
+
+    def exec_module(self, module):
+        name = module.__name__[len(self.prefix):]
+        source = self.store.materialize(name)
+        filename = module.__spec__.origin
+
+        # lets tracebacks and inspect show the materialized source
+        linecache.cache[filename] = (len(source), None, source.splitlines(True), filename)
+        module.__file__ = filename
+        exec(compile(source, filename, "exec"), module.__dict__)
+
+_store = None
+
+def get_store(directory="lineage"):
+    global _store
+    if _store is None:
+        _store = LineageStore(directory)
+        # after the path finder, so a file in generated/ is what gets imported, as it is what everything else reads
+        sys.meta_path.append(LineageFinder(_store))
+    return _store
+
+def _import_chain(paths):
+    store = get_store()
+    parent = None
+    for path in paths:
+        path = Path(path)
+        text = path.read_text()
+        store.record(path.stem, text, parent)
+        if store.materialize(path.stem) != text:
+            raise RuntimeError("round trip failed for " + str(path))
+        parent = path.stem
+        print("recorded", path.stem)
+
+def main(argv):
+    store = get_store()
+    command = argv[0] if argv else "stats"
+
+    if command == "import":
+        # files are recorded as one chain, each the parent of the next
+        _import_chain(argv[1:])
+    elif command == "show":
+        sys.stdout.write(store.materialize(argv[1]))
+    elif command == "log":
+        for name in store.ancestry(argv[1]):
+            dream = store.dreams[name]
+            print(dream["rev"], name, "-", dream["prompt"] or "")
+    elif command == "stats":
+        raw = sum(len(store.materialize(n)) for n in store.get_names())
+        print(len(store.dreams), "dreams,", len(store.revisions), "revisions")
+        print(raw, "bytes materialized,", store.disk_usage(), "bytes on disk")
+    else:
+        print("usage: python lineage.py [import <files...> | show <name> | log <name> | stats]")
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,361 @@
+import time
+import random
+import socket
+import threading
+import httpx
+from collections import deque
+from concurrent.futures import CancelledError, ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+import telemetry
+
+# gemini-2.5-flash free tier, see https://ai.google.dev/gemini-api/docs/rate-limits
+DEFAULT_REQUESTS_PER_MINUTE = 10
+DEFAULT_TOKENS_PER_MINUTE = 250000
+
+class CircuitOpenError(Exception):
+    pass
+
+class DeadlineExceeded(TimeoutError):
+    pass
+
+def estimate_tokens(text):
+    # roughly four characters a token
+    return len(text) // 4
+
+class StreamedResponse:
+
+    def __init__(self, text, usage_metadata, ttft_s, latency_s):
+        self.text = text
+        self.usage_metadata = usage_metadata
+        self.ttft_s = ttft_s
+        self.latency_s = latency_s
+
+class TokenBucket:
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, amount=1):
+        amount = min(amount, self.capacity)
+        waited = 0
+        while True:
+            with self.lock:
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return waited
+                wait = (amount - self.tokens) / self.rate
+            time.sleep(wait)
+            waited += wait
+
+    def adjust(self, amount):
+        # settles an estimate once the real cost is known, may go into debt
+        with self.lock:
+            self._refill()
+            self.tokens -= amount
+
+class CircuitBreaker:
+
+    def __init__(self, failure_threshold=5, reset_timeout=30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0
+        self.trips = 0
+        self.lock = threading.Lock()
+
+    def allow(self):
+        with self.lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and time.monotonic() - self.opened_at >= self.reset_timeout:
+                # let a single trial request through
+                self.state = "half_open"
+                return True
+            return False
+
+    def record_success(self):
+        with self.lock:
+            self.state = "closed"
+            self.failures = 0
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.state == "half_open" or self.failures >= self.failure_threshold:
+                if self.state != "open":
+                    self.trips += 1
+                self.state = "open"
+                self.opened_at = time.monotonic()
+
+class AnyCancel:
+
+    def __init__(self, *events):
+        self.events = [e for e in events if e is not None]
+
+    def is_set(self):
+        return any(e.is_set() for e in self.events)
+
+class StreamHandle:
+    """Lets the side that cancels a stream drop its connection, even while the stream is blocked waiting for a chunk."""
+
+    def __init__(self):
+        self.response = None
+        self.closed = False
+        self.lock = threading.Lock()
+
+    def attach(self, response):
+        with self.lock:
+            self.response = response
+            if self.closed:
+                self._abort()
+
+    def close(self):
+        with self.lock:
+            self.closed = True
+            if self.response is not None:
+                self._abort()
+
+    def _abort(self):
+        # closing the response would wait for the blocked read, shutting the socket down wakes it with an error
+        stream = self.response.extensions.get("network_stream")
+        sock = stream.get_extra_info("socket") if stream else None
+        if sock is not None:
+            try:
+                socket.socket.shutdown(sock, socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+_current = threading.local()
+
+def on_response(response):
+    # an httpx response hook, runs on the thread reading the stream once its headers are in
+    handle = getattr(_current, "handle", None)
+    if handle is not None:
+        handle.attach(response)
+
+class LlmClient:
+    """Shares one request quota between every chat, retrying what the quota or server rejects."""
+
+    def __init__(self, client, requests_per_minute=DEFAULT_REQUESTS_PER_MINUTE, tokens_per_minute=DEFAULT_TOKENS_PER_MINUTE,
+                 max_attempts=5, base_delay=1, max_delay=60, breaker=None, timeout=None, hedge=False,
+                 hedge_percentile=95, hedge_min_samples=20, hedge_default_after=30):
+        self.client = client
+        self.timeout = timeout
+        self.hedge = hedge
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_samples = hedge_min_samples
+        self.hedge_default_after = hedge_default_after
+        self.latencies = deque(maxlen=200)
+        # streams that can be cancelled are read on these threads, so the caller can drop them while they block
+        self.stream_pool = ThreadPoolExecutor(max_workers=16)
+        self.request_bucket = TokenBucket(requests_per_minute / 60, requests_per_minute)
+        self.token_bucket = TokenBucket(tokens_per_minute / 60, tokens_per_minute)
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.breaker = breaker or CircuitBreaker()
+
+        self.lock = threading.Lock()
+        self.counters = {
+            "requests": 0,
+            "successes": 0,
+            "failures": 0,
+            "retries": 0,
+            "rate_limited": 0,
+            "server_errors": 0,
+            "rejected_by_breaker": 0,
+            "cancelled": 0,
+            "timeouts": 0,
+            "hedges": 0,
+            "hedges_won": 0,
+            "throttle_wait_s": 0.0,
+            "backoff_wait_s": 0.0,
+            "tokens": 0,
+        }
+
+    def generate_content(self, model, contents, config, cancel=None):
+        estimated = sum(estimate_tokens(p.text) for c in contents for p in c.parts) + estimate_tokens(config.system_instruction or "")
+        deadline = time.monotonic() + self.timeout if self.timeout else None
+        if self.hedge or cancel is not None:
+            return self._watched(model, contents, config, cancel, deadline, estimated)
+        return self.call(self._stream, model, contents, config, None, deadline, None, estimated_tokens=estimated, deadline=deadline)
+
+    def hedge_after(self):
+        latencies = sorted(self.latencies)
+        if len(latencies) < self.hedge_min_samples:
+            return self.hedge_default_after
+        return latencies[min(len(latencies) - 1, len(latencies) * self.hedge_percentile // 100)]
+
+    def _watched(self, model, contents, config, cancel, deadline, estimated):
+        # a duplicate goes out once the first request is slower than almost all recent ones
+        own = [threading.Event(), threading.Event()]
+        handles = [StreamHandle(), StreamHandle()]
+        futures = {}
+        futures[self.stream_pool.submit(self.call, self._stream, model, contents, config, AnyCancel(cancel, own[0]), deadline, handles[0],
+                                        estimated_tokens=estimated, deadline=deadline)] = 0
+
+        hedge_after = self.hedge_after() if self.hedge else None
+        hedge_at = time.monotonic() + hedge_after if self.hedge else None
+        pending = set(futures)
+        error = None
+        while pending:
+            if cancel is not None and cancel.is_set():
+                for e, h in zip(own, handles):
+                    e.set()
+                    h.close()
+                raise CancelledError()
+
+            if hedge_at is not None and len(futures) == 1 and time.monotonic() >= hedge_at:
+                self._count("hedges")
+                telemetry.record("hedge", model=model, after_s=hedge_after)
+                hedge = self.stream_pool.submit(self.call, self._stream, model, contents, config, AnyCancel(cancel, own[1]), deadline, handles[1],
+                                                estimated_tokens=estimated, deadline=deadline)
+                futures[hedge] = 1
+                pending.add(hedge)
+
+            done, pending = wait(pending, timeout=0.1, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    winner = futures[future]
+                    own[1 - winner].set()
+                    handles[1 - winner].close()
+                    if winner == 1:
+                        self._count("hedges_won")
+                    return future.result()
+                error = error or future.exception()
+        raise error
+
+    def _stream(self, model, contents, config, cancel, deadline, handle=None):
+        # streamed so time to first token can be measured
+        if cancel is not None and cancel.is_set():
+            raise CancelledError()
+        start = time.perf_counter()
+        ttft = None
+        texts = []
+        usage = None
+        _current.handle = handle
+        try:
+            stream = self.client.models.generate_content_stream(model=model, contents=contents, config=config)
+            for chunk in stream:
+                if cancel is not None and cancel.is_set():
+                    # closing the stream drops the connection instead of reading the rest
+                    stream.close()
+                    raise CancelledError()
+                if deadline is not None and time.monotonic() > deadline:
+                    stream.close()
+                    raise DeadlineExceeded("no complete response within " + str(self.timeout) + "s")
+                if ttft is None:
+                    ttft = time.perf_counter() - start
+                if chunk.text:
+                    texts.append(chunk.text)
+                if chunk.usage_metadata:
+                    usage = chunk.usage_metadata
+            if cancel is not None and cancel.is_set():
+                # a dropped connection can also look like a stream that ended early
+                raise CancelledError()
+        except Exception as e:
+            if cancel is not None and cancel.is_set() and not isinstance(e, CancelledError):
+                # the read failed because its connection was dropped from the cancelling side
+                raise CancelledError() from e
+            raise
+        finally:
+            _current.handle = None
+        return StreamedResponse("".join(texts), usage, ttft, time.perf_counter() - start)
+
+    def _count(self, key, amount=1):
+        with self.lock:
+            self.counters[key] += amount
+
+    def _is_retryable(self, e):
+        if isinstance(e, (httpx.TransportError, ConnectionError, TimeoutError)):
+            return True
+        code = getattr(e, "code", None)
+        return isinstance(code, int) and (code == 429 or 500 <= code < 600)
+
+    def _backoff(self, attempt):
+        # full jitter keeps concurrent retries from arriving together
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    def call(self, fn, *args, estimated_tokens=0, deadline=None, **kwargs):
+        if not self.breaker.allow():
+            self._count("rejected_by_breaker")
+            raise CircuitOpenError("LLM circuit open after repeated failures")
+
+        for attempt in range(self.max_attempts):
+            if deadline is not None and time.monotonic() > deadline:
+                self._count("timeouts")
+                telemetry.record("timeout", attempt=attempt)
+                raise DeadlineExceeded("no complete response within " + str(self.timeout) + "s")
+
+            waited = self.request_bucket.acquire()
+            waited += self.token_bucket.acquire(estimated_tokens)
+            self._count("throttle_wait_s", waited)
+            self._count("requests")
+
+            try:
+                response = fn(*args, **kwargs)
+            except CancelledError:
+                self._count("cancelled")
+                raise
+            except Exception as e:
+                if isinstance(e, DeadlineExceeded) or (deadline is not None and time.monotonic() > deadline):
+                    self._count("timeouts")
+                    telemetry.record("timeout", error=repr(e), attempt=attempt)
+                    raise DeadlineExceeded("no complete response within " + str(self.timeout) + "s") from e
+
+                code = getattr(e, "code", None)
+                if code == 429:
+                    self._count("rate_limited")
+                elif isinstance(code, int) and code >= 500:
+                    self._count("server_errors")
+
+                if not self._is_retryable(e):
+                    # the service answered, it just refused this request
+                    self.breaker.record_success()
+                    self._count("failures")
+                    raise
+                if attempt == self.max_attempts - 1:
+                    self._count("failures")
+                    self.breaker.record_failure()
+                    raise
+
+                delay = self._backoff(attempt)
+                if deadline is not None:
+                    delay = min(delay, max(0, deadline - time.monotonic()))
+                self._count("retries")
+                self._count("backoff_wait_s", delay)
+                time.sleep(delay)
+                continue
+
+            self.breaker.record_success()
+            self._count("successes")
+            if getattr(response, "latency_s", None) is not None:
+                self.latencies.append(response.latency_s)
+            usage = getattr(response, "usage_metadata", None)
+            total = getattr(usage, "total_token_count", None) if usage else None
+            if total:
+                self.token_bucket.adjust(total - estimated_tokens)
+                self._count("tokens", total)
+            return response
+
+    def metrics(self):
+        with self.lock:
+            metrics = dict(self.counters)
+        metrics["breaker_state"] = self.breaker.state
+        metrics["breaker_trips"] = self.breaker.trips
+        metrics["request_bucket"] = self.request_bucket.tokens
+        metrics["token_bucket"] = self.token_bucket.tokens
+        metrics["hedge_after_s"] = self.hedge_after() if self.hedge else None
+        return metrics
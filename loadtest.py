@@ -0,0 +1,270 @@
+import os
+import sys
+import json
+import time
+import struct
+import asyncio
+import argparse
+import itertools
+import subprocess
+import urllib.request
+from websockets.asyncio.client import connect
+from websockets.exceptions import ConnectionClosed
+
+import codec
+from telemetry import percentile
+
+TIMESTAMP = struct.Struct("<d")
+REPORT_DIR = ".cache/loadtest"
+
+# seconds into the loop, down or up, key; replayed over and over by every client
+DEFAULT_SCRIPT = [
+    (0.5, "down", "right"), (1.5, "up", "right"),
+    (1.7, "down", "space"), (1.8, "up", "space"),
+    (2.0, "down", "left"), (3.0, "up", "left"),
+    (3.2, "down", "up"), (3.6, "up", "up"),
+    (3.8, "down", "down"), (4.2, "up", "down"),
+]
+
+def read_script(path):
+    script = []
+    with open(path, "r") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                event = json.loads(line)
+                script.append((float(event["t"]), event["type"], event["key"]))
+    return sorted(script)
+
+def get_json(url):
+    with urllib.request.urlopen(url, timeout=10) as response:
+        return json.loads(response.read())
+
+def process_cpu_s(pid):
+    # user and system time from /proc, so the server's own cost is counted and not just what its sessions report
+    try:
+        with open("/proc/" + str(pid) + "/stat", "r") as f:
+            fields = f.read().rpartition(")")[2].split()
+    except OSError:
+        return None
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+def server_cpu_s(stats, server_pid):
+    pids = [w["pid"] for w in stats["workers"]] + ([server_pid] if server_pid else [])
+    times = [process_cpu_s(pid) for pid in pids]
+    return None if None in times else sum(times)
+
+class Client:
+    """One simulated browser, replaying the script against a dream and timing every frame it receives."""
+
+    def __init__(self, url, dream, script, offset):
+        self.url = url + "/ws?dream=" + dream + "&timing=1"
+        self.dream = dream
+        self.script = script
+        self.offset = offset
+
+        self.connected = False
+        self.closed_code = None
+        self.closed_reason = None
+        self.frames = 0
+        self.key_frames = 0
+        self.bytes = 0
+        self.corrupt = 0
+        self.keys_sent = 0
+        self.latencies = []
+
+    async def _receive(self, websocket):
+        previous = None
+        async for message in websocket:
+            now = time.time()
+            data = message[TIMESTAMP.size:]
+            self.latencies.append(now - TIMESTAMP.unpack_from(message)[0])
+            self.frames += 1
+            self.bytes += len(message)
+            if codec.is_key_frame(data):
+                self.key_frames += 1
+            elif previous is None:
+                # a delta with nothing to apply it to, the server should never send one
+                self.corrupt += 1
+                continue
+            previous = codec.decode(data, previous)
+
+    async def _replay(self, websocket):
+        period = self.script[-1][0] + 0.5
+        start = time.monotonic() - self.offset
+        for loop in itertools.count():
+            for t, kind, key in self.script:
+                await asyncio.sleep(max(0, start + loop * period + t - time.monotonic()))
+                await websocket.send(json.dumps({"type": kind, "key": key}))
+                self.keys_sent += 1
+
+    async def run(self, duration):
+        try:
+            async with connect(self.url, max_size=None) as websocket:
+                self.connected = True
+                replay = asyncio.create_task(self._replay(websocket))
+                try:
+                    await asyncio.wait_for(self._receive(websocket), duration)
+                except asyncio.TimeoutError:
+                    pass
+                finally:
+                    replay.cancel()
+                self.closed_code = websocket.close_code
+                self.closed_reason = websocket.close_reason
+        except ConnectionClosed as e:
+            self.closed_code = e.rcvd.code if e.rcvd else None
+            self.closed_reason = e.rcvd.reason if e.rcvd else repr(e)
+        except OSError as e:
+            self.closed_reason = repr(e)
+
+class LoadTest:
+
+    def __init__(self, url, dreams, script, duration, ramp, max_latency_ms, max_drop_ratio, server_pid=None):
+        self.url = url
+        self.http_url = "http" + url[len("ws"):]
+        self.dreams = dreams
+        self.script = script
+        self.duration = duration
+        self.ramp = ramp
+        self.max_latency_ms = max_latency_ms
+        self.max_drop_ratio = max_drop_ratio
+        self.server_pid = server_pid
+
+    async def run_step(self, count):
+        clients = [Client(self.url, self.dreams[i % len(self.dreams)], self.script, i * 0.37 % 5) for i in range(count)]
+        tasks = []
+        for client in clients:
+            # connections are spread over the ramp so the first seconds aren't all handshakes
+            tasks.append(asyncio.create_task(client.run(self.duration)))
+            await asyncio.sleep(self.ramp / count)
+
+        # measured over the part of the step where every client is connected
+        await asyncio.sleep(1)
+        before = await asyncio.to_thread(get_json, self.http_url + "/stats")
+        cpu_before, client_cpu_before, start = server_cpu_s(before, self.server_pid), time.process_time(), time.monotonic()
+        await asyncio.sleep(max(1, self.duration - self.ramp - 2))
+        after = await asyncio.to_thread(get_json, self.http_url + "/stats")
+        cpu_after, elapsed = server_cpu_s(after, self.server_pid), time.monotonic() - start
+        client_cpu = time.process_time() - client_cpu_before
+        await asyncio.gather(*tasks)
+        return self._summarize(count, clients, after, cpu_before, cpu_after, client_cpu, elapsed)
+
+    def _summarize(self, count, clients, stats, cpu_before, cpu_after, client_cpu, elapsed):
+        connected = [c for c in clients if c.connected and c.frames]
+        latencies = [l * 1000 for c in connected for l in c.latencies]
+        sessions = stats["session_stats"]
+        produced = sum(s["produced"] for s in sessions)
+        dropped = sum(s["dropped"] for s in sessions)
+        server_cpu = None if cpu_before is None or cpu_after is None else 100 * (cpu_after - cpu_before) / elapsed
+
+        step = {
+            "clients": count,
+            "connected": len(connected),
+            "rejected": sum(c.closed_code == 1013 for c in clients),
+            "failed": [{"dream": c.dream, "code": c.closed_code, "reason": c.closed_reason} for c in clients
+                       if not c.frames and c.closed_code != 1013][:10],
+            "corrupt_frames": sum(c.corrupt for c in clients),
+            "frames": sum(c.frames for c in clients),
+            "keys_sent": sum(c.keys_sent for c in clients),
+            "fps_per_client": round(sum(c.frames for c in connected) / max(1, len(connected)) / self.duration, 1),
+            "kbps_per_client": round(sum(c.bytes for c in connected) * 8 / 1000 / max(1, len(connected)) / self.duration, 1),
+            "latency_ms": {"p" + str(p): round(percentile(latencies, p), 2) if latencies else None for p in (50, 90, 95, 99)},
+            "latency_ms_max": round(max(latencies), 2) if latencies else None,
+            "produced": produced,
+            "dropped": dropped,
+            "drop_ratio": round(dropped / produced, 4) if produced else 0,
+            "key_frames_requested": sum(s["key_frames_requested"] for s in sessions),
+            "session_cpu_percent": {"mean": round(sum(s["cpu_percent"] for s in sessions) / max(1, len(sessions)), 2),
+                                    "max": max((s["cpu_percent"] for s in sessions), default=None)},
+            "server_cpu_percent": round(server_cpu, 1) if server_cpu is not None else None,
+            "server_cpu_percent_per_session": round(server_cpu / max(1, len(sessions)), 2) if server_cpu is not None else None,
+            "client_cpu_percent": round(100 * client_cpu / elapsed, 1),
+        }
+        step["ok"] = (step["connected"] == count and not step["corrupt_frames"] and step["latency_ms"]["p95"] is not None
+                      and step["latency_ms"]["p95"] <= self.max_latency_ms and step["drop_ratio"] <= self.max_drop_ratio)
+        return step
+
+    async def run(self, steps):
+        results = []
+        for count in steps:
+            step = await self.run_step(count)
+            results.append(step)
+            print("pass" if step["ok"] else "FAIL", count, "clients,", step["connected"], "connected,",
+                  step["fps_per_client"], "fps,", "p95", step["latency_ms"]["p95"], "ms,",
+                  str(round(100 * step["drop_ratio"], 2)) + "% dropped,",
+                  step["server_cpu_percent_per_session"], "% server cpu a session,",
+                  step["client_cpu_percent"], "% tester cpu")
+            # a few seconds for the server to settle before the next step
+            await asyncio.sleep(2)
+        return results
+
+def start_server(args):
+    command = [sys.executable, "server.py", "--host", "127.0.0.1", "--port", str(args.port), "--fps", str(args.fps),
+               "--max-sessions", str(max(args.steps)), "--max-queue", str(args.max_queue), "--report-every", "3600"]
+    if args.workers:
+        command += ["--workers", str(args.workers)]
+    server = subprocess.Popen(command, stdout=subprocess.DEVNULL)
+    url = "http://127.0.0.1:" + str(args.port)
+    for _ in range(300):
+        try:
+            get_json(url + "/dreams")
+            return server
+        except OSError:
+            if server.poll() is not None:
+                raise RuntimeError("server.py exited with " + str(server.returncode))
+            time.sleep(0.1)
+    server.terminate()
+    raise RuntimeError("server.py didn't start listening on " + url)
+
+def main():
+    parser = argparse.ArgumentParser(description="Load the dream streaming server with simulated clients and report its capacity.")
+    parser.add_argument("--url", help="a running server such as ws://127.0.0.1:8765, otherwise one is started on --port")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--workers", type=int, help="worker processes for the started server")
+    parser.add_argument("--fps", type=int, default=30, help="frame rate for the started server")
+    parser.add_argument("--max-queue", type=int, default=4, help="queue limit for the started server")
+    parser.add_argument("--steps", default="10,50,100,200", help="client counts, run one after another")
+    parser.add_argument("--duration", type=float, default=15, help="seconds every step runs")
+    parser.add_argument("--ramp", type=float, default=3, help="seconds over which a step's clients connect")
+    parser.add_argument("--dreams", help="comma separated dreams, every saved one by default")
+    parser.add_argument("--script", help="JSONL of {\"t\", \"type\", \"key\"} key events looped by every client")
+    parser.add_argument("--max-latency-ms", type=float, default=100, help="p95 delivery latency a passing step stays under")
+    parser.add_argument("--max-drop-ratio", type=float, default=0.01, help="share of frames a passing step may drop")
+    parser.add_argument("--report", default=None, help="defaults to " + REPORT_DIR + "/<time>.json")
+    args = parser.parse_args()
+    args.steps = [int(s) for s in args.steps.split(",")]
+
+    server = None if args.url else start_server(args)
+    url = args.url or "ws://127.0.0.1:" + str(args.port)
+    try:
+        http_url = "http" + url[len("ws"):]
+        dreams = args.dreams.split(",") if args.dreams else get_json(http_url + "/dreams")
+        script = read_script(args.script) if args.script else DEFAULT_SCRIPT
+        test = LoadTest(url, dreams, script, args.duration, args.ramp, args.max_latency_ms, args.max_drop_ratio,
+                        server.pid if server else None)
+        steps = asyncio.run(test.run(args.steps))
+    finally:
+        if server:
+            server.terminate()
+            server.wait()
+
+    passed = [s["clients"] for s in steps if s["ok"]]
+    summary = {
+        "url": url,
+        "fps": args.fps if server else None,
+        "dreams": dreams,
+        "duration_s": args.duration,
+        "max_latency_ms": args.max_latency_ms,
+        "max_drop_ratio": args.max_drop_ratio,
+        # the most clients a step served within the limits
+        "capacity": max(passed) if passed else 0,
+    }
+    report = args.report or os.path.join(REPORT_DIR, str(int(time.time())) + ".json")
+    os.makedirs(os.path.dirname(report) or ".", exist_ok=True)
+    with open(report, "w") as f:
+        json.dump({"summary": summary, "steps": steps}, f, indent=1)
+    print(json.dumps(summary, indent=1))
+    print("report written to", report)
+
+if __name__ == "__main__":
+    main()
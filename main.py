@@ -1,23 +1,47 @@
 import pygame
 import importlib
 import time
+import zlib
+import traceback
+import argparse
+import threading
 from enum import Enum
-from google import genai
-from google.genai import types
 
-from generated.helpers import Render, Input, Sound
+from generated.helpers import Render, Input, Sound, context_of
 from ui import Button, TextInput, OptionMenu, TextBox
-from util import DiskUtil, LlmUtil
+from util import DiskUtil, LlmUtil, CANDIDATE_WALL_LIMIT
+import telemetry
+from thumbnails import ThumbnailCache
+from gallery import Gallery
+import gallery
+from overlay import PerfOverlay
+from profiling import DreamProfiler
+from sampler import LineSampler
+import timeline
+from llm_client import LlmClient
+import lineage
+import headless
 
 class State(Enum):
     builder = 0
     loading_program = 1
     program_menu = 2
     start = 3
+    gallery = 4
 
 class Main:
 
-    def __init__(self):
+    max_repairs = 2
+    idle_wait_ms = 1000
+    max_fps = 60
+    overlay_key = pygame.K_F3
+    trace_key = pygame.K_F4
+    profile_key = pygame.K_F5
+    profile_seconds = 5
+    heat_key = pygame.K_F6
+
+    def __init__(self, resume=None, llm="gemini", candidates=1, timeout=120, hedge=False, edits=True, overlay=False, trace_spike_ms=None,
+                 dream=None, profile=None, sample=False):
         pygame.mixer.pre_init(44100, -16, 1, 512)
         pygame.init()
         pygame.display.set_caption("Robot Dreams")
@@ -25,56 +49,202 @@ class Main:
 
         self.font = pygame.font.Font(None, 30)
 
-        self.builder_button = Button("visualizer", pygame.Rect(0, 760, 400, 40), self.font)
-        self.program_menu_button = Button("logged dreams", pygame.Rect(400, 760, 400, 40), self.font)
+        self.builder_button = Button("visualizer", pygame.Rect(0, 760, 267, 40), self.font)
+        self.program_menu_button = Button("logged dreams", pygame.Rect(267, 760, 266, 40), self.font)
+        self.gallery_button = Button("gallery", pygame.Rect(533, 760, 267, 40), self.font)
 
         self.start_text_box = TextBox(DiskUtil.read_starting_text().split("\n"), pygame.Rect(0, 0, 800, 800), self.font)
 
+        self.thumbnails = ThumbnailCache()
+        self.gallery = None
+        self.gallery_pool = None
+        self.lineage = lineage.get_store()
+        self.profiler = DreamProfiler()
+        self.sampler = None
+        if sample:
+            # cheap enough to leave running for the whole session
+            self.sampler = LineSampler()
+            self.sampler.start()
+
         self._set_state(State.start)
 
-        self.client = genai.Client()
+        self.llm = LlmClient(LlmUtil.create_client(llm, timeout), timeout=timeout, hedge=hedge)
+        self.timeout = timeout
+        self.edits = edits
+        self.candidates = candidates
+        self.validators = None
+        if candidates > 1:
+            self.validators = headless.create_pool(candidates)
         self.system_instructions = DiskUtil.read_system_instructions()
         self._create_new_chat()
         self._load_default_program()
+        if resume:
+            self._resume_session(resume)
+        if dream:
+            self._load_program(LlmUtil.load_local_program(dream))
+            self._set_state(State.builder)
+        if profile:
+            self.profiler.start(self._program_name(), profile)
 
         self.program_future = None
+        self.repair_future = None
+        self.repair_attempts = 0
+
+        self.paused = False
+        self.pending_events = []
+        self.frame_hash = None
+
+        self.overlay = PerfOverlay(pygame.font.Font(None, 16))
+        self.overlay.visible = overlay
+        self.spike_watch = timeline.SpikeWatch(trace_spike_ms)
 
     def _set_state(self, new_state):
         self.state = new_state
+        self.redraw = True
+        if self.gallery and self.state != State.gallery:
+            self.gallery.close()
+            # replaced by the gallery if a dream hung one of its workers
+            self.gallery_pool = self.gallery.pool
+            self.gallery = None
         if self.state == State.program_menu:
             self._open_program_menu()
+        elif self.state == State.gallery:
+            self._open_gallery()
         self._recalculate_toggle_button_hover()
 
+    def _set_instructions(self, instructions):
+        self.instructions = instructions
+        self.instruction_surf = self.font.render(self.instructions, False, (255, 255, 255))
+        self.redraw = True
+
     def _load_program(self, program):
+        # a capture is of one dream, whatever it has so far is written when another takes over
+        self.profiler.finish()
         self.program = program
-        self.instructions = self.program.get_instructions()
+        self.context = context_of(program)
+        self._set_instructions(self.program.get_instructions())
         self.next_idea_buttons = self._get_next_idea_buttons(self.program.get_next_idea(), self.font)
 
+    def _program_name(self):
+        return type(self.program).__module__.rpartition(".")[2]
+
     def _load_default_program(self):
         self._load_program(LlmUtil.load_default_program())
 
+    def _get_validators(self):
+        if self.validators is None:
+            self.validators = headless.create_pool(1)
+        return self.validators
+
     def _load_new_program_async(self, prompt):
         if self.program_future:
             return
+        self._cancel_repair()
 
         self._set_state(State.loading_program)
         self.text_input.focused = False
 
         name = str(int(time.time())) + "".join(filter(str.isalnum, prompt))
-        self.program_future = LlmUtil.load_new_program_async(self.chat, prompt, name)
+        self.program_cancel = threading.Event()
+        self.program_deadline = time.monotonic() + self._program_timeout() if self.timeout else None
+        if self.candidates > 1:
+            self.program_future = LlmUtil.load_best_program_async(self.chat, prompt, name, self.chat_program_name, self.candidates, self.validators, self.program_cancel)
+        else:
+            self.program_future = LlmUtil.load_new_program_async(self.chat, prompt, name, self.chat_program_name, self.program_cancel, self.edits)
+        self.program_future_name = name
+
+    def _program_timeout(self):
+        # every step the request can take one after another, and a few seconds to load the result
+        timeout = self.timeout
+        if self.candidates > 1:
+            # the winner is validated after its reply
+            timeout += CANDIDATE_WALL_LIMIT + headless.VALIDATION_GRACE
+        elif self.edits and self.chat.latest_program is not None:
+            # a diff that doesn't apply is asked for again as a whole program
+            timeout += self.timeout
+        return timeout + 5
 
     def _check_program_future(self):
         if not self.program_future:
             return
 
+        if not self.program_future.done() and self.program_deadline and time.monotonic() > self.program_deadline:
+            # the request should have timed out by itself, stop waiting on it either way
+            self.program_cancel.set()
+            telemetry.record("abandoned", name=self.program_future_name, timeout_s=self.timeout)
+            self.program_future = None
+            self._set_state(State.builder)
+            self._load_default_program()
+            return
+
         if self.program_future.done():
             self._set_state(State.builder)
+            name = self.program_future_name
             program = self.program_future.result()
             self._load_program(program)
             self.program_future = None
+            self.repair_attempts = 0
+            # even a broken program is what the chat will refine next
+            if self.lineage.has(name):
+                self.chat_program_name = name
+                if type(program).__module__ != "generated." + name:
+                    # it was written but didn't load, load it again to see why
+                    try:
+                        self._load_program(LlmUtil.load_local_program(name))
+                    except Exception as e:
+                        self._start_repair(name, LlmUtil.describe_error(e, name))
+            self.chat.save(self.session_path, self.chat_program_name)
+
+    def _start_repair(self, name, failure):
+        # only the chat's own latest dream can be fixed on this chat
+        if name != self.chat_program_name or self.repair_attempts >= self.max_repairs or self.program_future or self.repair_future:
+            return
+
+        self.repair_name = name
+        self.repair_prompt = LlmUtil.repair_prompt(failure, DiskUtil.read_program(name))
+        telemetry.record("repair", name=name, error=failure["error"], line=failure["line"])
+        self._send_repair()
+
+    def _send_repair(self):
+        self.repair_attempts += 1
+        # a diff first, the whole program again if that doesn't validate
+        edit = self.edits and self.repair_attempts == 1
+        self.repair_future_name = self.repair_name + "_fix" + str(self.repair_attempts)
+        self.repair_cancel = threading.Event()
+        self.repair_future = LlmUtil.repair_program_async(self.chat, self.repair_prompt, self.repair_future_name, self.repair_name,
+                                                         self._get_validators(), edit, self.repair_cancel)
+        self._set_instructions("dream crashed, repairing it (attempt " + str(self.repair_attempts) + " of " + str(self.max_repairs) + ")...")
+
+    def _check_repair_future(self):
+        if not self.repair_future or not self.repair_future.done():
+            return
+
+        fixed = self.repair_future.result()
+        self.repair_future = None
+        if fixed:
+            self.chat_program_name = self.repair_future_name
+            self._load_program(LlmUtil.load_local_program(self.repair_future_name))
+            self.chat.save(self.session_path, self.chat_program_name)
+        elif self.repair_attempts < self.max_repairs:
+            self._send_repair()
+        else:
+            self._set_instructions(self.program.get_instructions())
+
+    def _cancel_repair(self):
+        if self.repair_future:
+            self.repair_cancel.set()
+            self.repair_future = None
 
     def _create_new_chat(self):
-        self.chat = LlmUtil.create_new_chat(self.client, self.system_instructions)
+        self.chat = LlmUtil.create_new_chat(self.llm, self.system_instructions)
+        self.chat_program_name = None
+        self.session_path = ".cache/sessions/" + str(int(time.time())) + ".json"
+
+    def _resume_session(self, path):
+        self.chat_program_name = self.chat.load(path)
+        self.session_path = path
+        if self.chat_program_name:
+            self._load_program(LlmUtil.load_local_program(self.chat_program_name))
 
     def _get_next_idea_buttons(self, next_ideas, font):
         ideas = ["reboot", "keep dreaming"]
@@ -88,7 +258,14 @@ class Main:
         return buttons
 
     def _open_program_menu(self):
-        self.program_menu = OptionMenu(pygame.Rect(39, 37, 800, 760), self.font, DiskUtil.get_saved_program_names())
+        names = DiskUtil.get_saved_program_names()
+        self.thumbnails.prune(names)
+        self.program_menu = OptionMenu(pygame.Rect(39, 37, 800, 760), self.font, names, self.thumbnails)
+
+    def _open_gallery(self):
+        if self.gallery_pool is None:
+            self.gallery_pool = gallery.TilePool()
+        self.gallery = Gallery(pygame.Rect(39, 37, 800, 720), self.font, DiskUtil.get_saved_program_names(), self.gallery_pool)
 
     def _recalculate_toggle_button_hover(self):
         pos = pygame.mouse.get_pos()
@@ -96,6 +273,7 @@ class Main:
         
         self.builder_button.hovered = self.state == State.builder or self.builder_button.check_hovered(pos) 
         self.program_menu_button.hovered = self.state == State.program_menu or self.program_menu_button.check_hovered(pos)
+        self.gallery_button.hovered = self.state == State.gallery or self.gallery_button.check_hovered(pos)
 
     def _handle_toggle_button_event(self, event):
         if event.type == pygame.MOUSEMOTION:
@@ -106,6 +284,8 @@ class Main:
                 self._set_state(State.builder)
             elif self.program_menu_button.hovered and self.state != State.program_menu:
                 self._set_state(State.program_menu)
+            elif self.gallery_button.hovered and self.state != State.gallery:
+                self._set_state(State.gallery)
 
     def _handle_builder_event(self, event):
         if event.type == pygame.KEYDOWN:
@@ -128,6 +308,7 @@ class Main:
             for b in self.next_idea_buttons:
                 if b.check_hovered(pos):
                     if b.text == 'reboot':
+                        self._cancel_repair()
                         self._load_default_program()
                         self._create_new_chat()                                
                     else:
@@ -135,10 +316,29 @@ class Main:
         return False
 
     def _handle_game_event(self, event):
-        if event.type == pygame.KEYDOWN:
-            Input.key_down(pygame.key.name(event.key))
-        elif event.type == pygame.KEYUP:
-            Input.key_up(pygame.key.name(event.key))
+        with self.context:
+            if event.type == pygame.KEYDOWN:
+                Input.key_down(pygame.key.name(event.key))
+            elif event.type == pygame.KEYUP:
+                Input.key_up(pygame.key.name(event.key))
+
+    def _is_idle(self):
+        if self.state == State.start:
+            return True
+        if self.state == State.program_menu:
+            return not self.program_menu.is_animating() and not self.thumbnails.pending()
+        return False
+
+    def _write_heat(self):
+        paths = self.sampler.write()
+        print("line heat written to", ", ".join(paths) or "nothing, no dream has been sampled")
+        self.sampler.print_hottest()
+
+    def _wait_for_event(self, timeout=None):
+        # blocks without burning cpu, the event is handled by the next frame
+        event = pygame.event.wait(timeout) if timeout else pygame.event.wait()
+        if event.type != pygame.NOEVENT:
+            self.pending_events.append(event)
 
     def run(self):
         program_size = (800, 600)
@@ -148,15 +348,66 @@ class Main:
         running = True
 
         computer = pygame.Surface((800, 800))
+        computer_rect = computer.get_rect(topleft=(39, 37))
         background = pygame.image.load("background.png").convert_alpha()
+        # the computer covers the only part of the background that is ever drawn over
+        screen.blit(background, (0, 0))
+        pygame.display.flip()
+        # dreams are scaled straight onto the display, nearest neighbour at a whole multiple is the cheap path
+        program_rect = pygame.Rect(computer_rect.topleft, program_size)
+        program_view = screen.subsurface(program_rect)
         self.text_input = TextInput(pygame.Rect(5, 690, 790, 40), self.font, "(click to type...)")
+        loading_surf = self.font.render("processing dream signal...", False, (255, 255, 255))
 
         dt = 0
         while running:
             # update
-            for event in pygame.event.get():
+            frame_start = time.perf_counter_ns()
+            events = self.pending_events + pygame.event.get()
+            self.pending_events = []
+            if events:
+                self.redraw = True
+            for event in events:
+                if event.type == pygame.KEYDOWN and event.key == self.overlay_key:
+                    self.overlay.visible = not self.overlay.visible
+                    # a full redraw takes a closed overlay off the screen
+                    self.redraw = True
+                    continue
+                if event.type == pygame.KEYDOWN and event.key == self.trace_key:
+                    print("timeline written to", timeline.export())
+                    continue
+                if event.type == pygame.KEYDOWN and event.key == self.profile_key:
+                    if self.profiler.is_active():
+                        self.profiler.finish()
+                    else:
+                        print("profiling", self._program_name(), "for", self.profile_seconds, "seconds...")
+                        self.profiler.start(self._program_name(), self.profile_seconds)
+                    continue
+                if event.type == pygame.KEYDOWN and event.key == self.heat_key and self.sampler:
+                    self._write_heat()
+                    continue
+                if event.type == pygame.WINDOWEXPOSED:
+                    screen.blit(background, (0, 0))
+                    pygame.display.flip()
+                if event.type in (pygame.WINDOWMINIMIZED, pygame.WINDOWFOCUSLOST):
+                    self.paused = True
+                elif event.type in (pygame.WINDOWRESTORED, pygame.WINDOWFOCUSGAINED):
+                    self.paused = False
+
                 if event.type == pygame.QUIT:
                     running = False
+                    self.profiler.finish()
+                    if self.sampler:
+                        self.sampler.stop()
+                        self._write_heat()
+                    self.thumbnails.shutdown()
+                    if self.validators:
+                        self.validators.shutdown(cancel_futures=True)
+                    if self.gallery:
+                        self.gallery.close()
+                        self.gallery_pool = self.gallery.pool
+                    if self.gallery_pool:
+                        self.gallery_pool.shutdown(cancel_futures=True)
                     return
                 if self.state == State.builder:
                     consumed = self._handle_builder_event(event)
@@ -169,61 +420,135 @@ class Main:
                     self._handle_toggle_button_event(event)
                     name = self.program_menu.handle_event(event)
                     if name is not None:
+                        self._cancel_repair()
+                        self._load_program(LlmUtil.load_local_program(name))
+                        self._set_state(State.builder)
+                elif self.state == State.gallery:
+                    self._handle_toggle_button_event(event)
+                    name = self.gallery.handle_event(event) if self.gallery else None
+                    if name is not None:
+                        self._cancel_repair()
                         self._load_program(LlmUtil.load_local_program(name))
                         self._set_state(State.builder)
                 elif self.state == State.start:
                     if event.type == pygame.KEYDOWN:
                         self._set_state(State.builder)
-                    
+            timeline.add("events", frame_start, time.perf_counter_ns(), count=len(events))
 
-            if self.state == State.loading_program:
-                self._check_program_future()
+            with timeline.span("check_futures", "llm"):
+                if self.state == State.loading_program:
+                    self._check_program_future()
+                self._check_repair_future()
 
-            # draw
-            screen.blit(background, (0, 0))
-
-            Render.clear_screen()
-
-            computer.fill((0, 0, 0))
+            if self.paused and not self.redraw:
+                # minimized or in the background, nothing runs until the window comes back
+                self._wait_for_event()
+                clock.tick()
+                dt = 0
+                continue
 
-            if self.state == State.start:
-                self.start_text_box.draw(computer)
-
-            if self.state == State.builder or self.state == State.loading_program:
+            # draw
+            playing = self.state == State.builder or self.state == State.loading_program
+            t = time.perf_counter()
+            # an expose while paused only composes again, the dream's last frame is put back as it was
+            if playing and not self.paused:
                 try:
-                    self.program.update(dt / 1000)
-                    self.program.draw()
-                except:
-                    import traceback
+                    with self.context:
+                        Render.clear_screen()
+                        with self.profiler:
+                            self.program.update(dt / 1000)
+                        t = self.overlay.mark("update", t)
+                        with self.profiler:
+                            self.program.draw()
+                        t = self.overlay.mark("draw", t)
+                except Exception as e:
                     traceback.print_exc()
+                    name = self._program_name()
                     self._load_default_program()
+                    self._start_repair(name, LlmUtil.describe_error(e, name))
 
-                surf = pygame.transform.scale(Render.screen, program_size)
-                computer.blit(surf, (0, 0))
+            # the chrome around the dream only changes on input, a new program or a new state
+            full = self.redraw or self.state == State.program_menu or self.state == State.gallery or (self.overlay.visible and not playing)
+            self.redraw = False
+            t = time.perf_counter()
+            compose_start = time.perf_counter_ns()
+            if full:
+                computer.fill((0, 0, 0))
 
-            if self.state == State.builder:
-                instruction_surf = self.font.render(self.instructions, False, (255, 255, 255))
-                computer.blit(instruction_surf, (5, 605))
+                if self.state == State.start:
+                    self.start_text_box.draw(computer)
 
-                for b in self.next_idea_buttons:
-                    b.draw(computer)
+                if self.state == State.builder:
+                    computer.blit(self.instruction_surf, (5, 605))
+
+                    for b in self.next_idea_buttons:
+                        b.draw(computer)
 
-                self.text_input.draw(computer)
-            elif self.state == State.loading_program:
-                loading_surf = self.font.render("processing dream signal...", False, (255, 255, 255))
-                computer.blit(loading_surf, (5, 605))
+                    self.text_input.draw(computer)
+                elif self.state == State.loading_program:
+                    computer.blit(loading_surf, (5, 605))
 
-            if self.state == State.builder or self.state == State.program_menu:
-                self.builder_button.draw(computer)
-                self.program_menu_button.draw(computer)
+                if self.state == State.builder or self.state == State.program_menu or self.state == State.gallery:
+                    self.builder_button.draw(computer)
+                    self.program_menu_button.draw(computer)
+                    self.gallery_button.draw(computer)
 
-            screen.blit(computer, (39, 37))
+                screen.blit(computer, computer_rect)
+            timeline.add("compose", compose_start, time.perf_counter_ns(), full=full)
+
+            changed = False
+            if playing:
+                frame_hash = zlib.crc32(self.context.screen.get_buffer())
+                changed = frame_hash != self.frame_hash
+                self.frame_hash = frame_hash
+                # the overlay is drawn over the dream, which has to be under it again every frame
+                if changed or full or self.overlay.visible:
+                    pygame.transform.scale(self.context.screen, program_size, program_view)
 
             if self.state == State.program_menu:
                 self.program_menu.draw(screen)
-
-            pygame.display.flip()
-            dt = clock.tick(60)
+            elif self.state == State.gallery:
+                self.gallery.draw(screen)
+            t = self.overlay.mark("scale", t)
+
+            if self.overlay.visible:
+                self.overlay.draw(screen, computer_rect.topleft)
+            t = time.perf_counter()
+            if full:
+                pygame.display.update(computer_rect)
+            elif changed or self.overlay.visible:
+                pygame.display.update(program_rect)
+            self.overlay.mark("flip", t)
+            self.overlay.end_frame(self.context)
+
+            frame_end = time.perf_counter_ns()
+            timeline.add("frame", frame_start, frame_end, state=self.state.name)
+            spike = self.spike_watch.check((frame_end - frame_start) / 1e6)
+            if spike:
+                print("slow frame, timeline written to", spike)
+            if self._is_idle():
+                self._wait_for_event(self.idle_wait_ms)
+                clock.tick()
+                dt = 0
+            else:
+                # dreams and input keep their full rate while static frames only skip the present
+                dt = clock.tick(self.max_fps)
 
 if __name__ == "__main__":
-    Main().run()
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--resume", metavar="SESSION", help="continue a chat saved in .cache/sessions")
+    parser.add_argument("--llm", default="gemini", help="gemini, or fake[:option=value,...] to dream offline")
+    parser.add_argument("--candidates", type=int, default=1, help="generate this many programs per prompt and keep the first that validates, costs as many requests")
+    parser.add_argument("--timeout", type=float, default=120, help="seconds before a dream request is given up")
+    parser.add_argument("--hedge", action="store_true", help="send a duplicate request when one is slower than the recent p95")
+    parser.add_argument("--full-programs", action="store_true", help="always ask for whole programs instead of diffs against the current one")
+    parser.add_argument("--overlay", action="store_true", help="start with the performance overlay open, F3 toggles it")
+    parser.add_argument("--trace-spike-ms", type=float, help="write the timeline to .cache/traces when a frame takes longer, F4 writes it any time")
+    parser.add_argument("--dream", help="start playing this saved dream")
+    parser.add_argument("--profile", type=float, metavar="SECONDS", help="profile the dream's update and draw for this long once it plays, F5 does the same")
+    parser.add_argument("--sample", action="store_true", help="sample which lines of the dreams the time goes to, F6 writes them annotated to .cache/heat")
+    args = parser.parse_args()
+
+    Main(resume=args.resume, llm=args.llm, candidates=args.candidates, timeout=args.timeout, hedge=args.hedge, edits=not args.full_programs,
+         overlay=args.overlay, trace_spike_ms=args.trace_spike_ms, dream=args.dream, profile=args.profile,
+         sample=args.sample).run()
@@ -0,0 +1,103 @@
+import os
+import sys
+import time
+from collections import deque
+import pygame
+
+import timeline
+
+TIMINGS = ["update", "draw", "scale", "flip"]
+# each gets a sparkline, frame is the whole loop including the wait for the next one
+GRAPHS = TIMINGS + ["frame"]
+
+def rss_mb():
+    # resident size from /proc, where there is one
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    except (OSError, ValueError, IndexError):
+        return None
+
+def sound_voices():
+    if not pygame.mixer.get_init():
+        return 0
+    return sum(pygame.mixer.Channel(i).get_busy() for i in range(pygame.mixer.get_num_channels()))
+
+class PerfOverlay:
+    """Frame timings over the last few seconds as sparklines, with fps, draw calls, sound voices and memory."""
+
+    def __init__(self, font, samples=240, budget_ms=1000 / 60, text_every=0.25):
+        self.font = font
+        self.visible = False
+        self.budget_ms = budget_ms
+        self.text_every = text_every
+
+        # recorded while hidden too, so the stutter is already there when the overlay is opened
+        self.history = {name: deque(maxlen=samples) for name in GRAPHS + ["overlay"]}
+        self.current = dict.fromkeys(TIMINGS, 0.0)
+        self.render_calls = {}
+        self.last_frame = time.perf_counter()
+
+        self.row_height = 16
+        self.graph_x = 130
+        self.surf = pygame.Surface((self.graph_x + samples + 5, self.row_height * (len(GRAPHS) + 3) + 5), pygame.SRCALPHA)
+        self.text_surfs = []
+        self.text_time = 0
+
+    def mark(self, name, start):
+        # adds the time since start to this frame's name and returns now, to start the next one from, the timeline gets it as a span
+        now = time.perf_counter()
+        self.current[name] += now - start
+        timeline.add(name, int(start * 1e9), int(now * 1e9))
+        return now
+
+    def end_frame(self, context):
+        now = time.perf_counter()
+        for name in TIMINGS:
+            self.history[name].append(self.current[name] * 1000)
+            self.current[name] = 0.0
+        self.history["frame"].append((now - self.last_frame) * 1000)
+        self.last_frame = now
+
+        if context.render_calls:
+            self.render_calls = dict(context.render_calls)
+            context.render_calls.clear()
+
+    def _fps(self):
+        frames = list(self.history["frame"])[-30:]
+        return 1000 * len(frames) / sum(frames) if frames and sum(frames) else 0
+
+    def _render_text(self):
+        # text is the expensive part, so it's only rendered a few times a second
+        lines = [name + " %.2f ms" % (self.history[name][-1] if self.history[name] else 0) for name in GRAPHS]
+        lines.append("%.0f fps, overlay %.2f ms" % (self._fps(), self.history["overlay"][-1] if self.history["overlay"] else 0))
+        calls = sorted(self.render_calls.items(), key=lambda c: -c[1])
+        lines.append("calls " + (", ".join(k + " " + str(v) for k, v in calls) or "none"))
+        rss = rss_mb()
+        lines.append("voices " + str(sound_voices()) + ", heap " + str(sys.getallocatedblocks()) + " blocks"
+                     + (", rss %.0f mb" % rss if rss is not None else ""))
+        self.text_surfs = [self.font.render(line, False, (255, 255, 255)) for line in lines]
+
+    def _sparkline(self, values, y):
+        if len(values) < 2:
+            return
+        h = self.row_height - 3
+        x = self.graph_x + self.history["frame"].maxlen - len(values)
+        # the top of a row is a whole frame's budget, anything over it is clipped there
+        points = [(x + i, y + h - min(h, v * h / self.budget_ms)) for i, v in enumerate(values)]
+        pygame.draw.lines(self.surf, (255, 255, 255), False, points)
+
+    def draw(self, surface, pos):
+        start = time.perf_counter()
+        if start - self.text_time > self.text_every:
+            self.text_time = start
+            self._render_text()
+
+        self.surf.fill((0, 0, 0, 190))
+        for i, text_surf in enumerate(self.text_surfs):
+            self.surf.blit(text_surf, (5, 3 + i * self.row_height))
+        for i, name in enumerate(GRAPHS):
+            self._sparkline(self.history[name], 3 + i * self.row_height)
+        surface.blit(self.surf, pos)
+        self.history["overlay"].append((time.perf_counter() - start) * 1000)
+        return self.surf.get_rect(topleft=pos)
@@ -0,0 +1,90 @@
+import os
+import time
+import cProfile
+import pstats
+from collections import defaultdict
+
+PROGRAM_DIR = "generated"
+
+def _label(func):
+    filename, line, name = func
+    if filename == "~":
+        # builtins have no file, their name already says what they are
+        return name
+    return name + " (" + os.path.basename(filename) + ":" + str(line) + ")"
+
+def folded_stacks(stats, max_depth=64, min_seconds=1e-6):
+    # cProfile only keeps caller and callee pairs, so a function's time is split down each path in proportion to the calls it made
+    callees = defaultdict(dict)
+    for func, (cc, nc, tt, ct, callers) in stats.stats.items():
+        for caller, (_, _, _, edge_ct) in callers.items():
+            callees[caller][func] = edge_ct
+
+    folded = defaultdict(float)
+
+    def walk(func, path, funcs, seconds):
+        tt, ct = stats.stats[func][2], stats.stats[func][3]
+        share = seconds / ct if ct else 0
+        path = path + [_label(func)]
+        folded[";".join(path)] += tt * share
+        if len(path) >= max_depth:
+            return
+        for callee, edge_ct in callees[func].items():
+            if callee not in funcs and edge_ct * share >= min_seconds:
+                walk(callee, path, funcs | {callee}, edge_ct * share)
+
+    for func, (_, _, _, ct, callers) in stats.stats.items():
+        # roots are the calls made right after the profiler was switched on, update and draw, not the profiler switching off
+        if not callers and "_lsprof" not in func[2] and func[0] != __file__:
+            walk(func, [], {func}, ct)
+    # microseconds, since flame graph tools want whole numbers
+    return [stack + " " + str(round(seconds * 1e6)) for stack, seconds in folded.items() if round(seconds * 1e6)]
+
+class DreamProfiler:
+    """Profiles a dream's update and draw for a few seconds, then writes pstats and folded stacks next to it."""
+
+    def __init__(self, directory=PROGRAM_DIR):
+        self.directory = directory
+        self.profile = None
+
+    def is_active(self):
+        return self.profile is not None
+
+    def start(self, name, seconds):
+        self.name = name
+        self.seconds = seconds
+        # counted from the first profiled frame, so a capture asked for from the command line waits for the dream to play
+        self.deadline = None
+        self.profile = cProfile.Profile()
+
+    def __enter__(self):
+        if self.profile:
+            if self.deadline is None:
+                self.deadline = time.monotonic() + self.seconds
+            self.profile.enable()
+        return self
+
+    def __exit__(self, *exc):
+        if self.profile:
+            self.profile.disable()
+            if time.monotonic() > self.deadline:
+                self.finish()
+
+    def finish(self):
+        if not self.profile:
+            return None
+        profile, self.profile = self.profile, None
+        # pstats refuses a profile that never ran, as when the capture was asked for but no dream played
+        if not profile.getstats():
+            print("nothing was profiled, no dream played while", self.name, "was being captured")
+            return None
+        stats = pstats.Stats(profile)
+
+        path = os.path.join(self.directory, self.name)
+        stats.dump_stats(path + ".pstats")
+        with open(path + ".folded", "w") as f:
+            f.write("\n".join(folded_stacks(stats)) + "\n")
+
+        print("profiled", self.name, "for", self.seconds, "seconds, wrote", path + ".pstats", "and", path + ".folded")
+        stats.strip_dirs().sort_stats("tottime").print_stats(20)
+        return path + ".pstats"
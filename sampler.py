@@ -0,0 +1,141 @@
+import os
+import sys
+import time
+import argparse
+import threading
+import linecache
+from collections import Counter
+
+PACKAGE = "generated."
+# the dreams' library, its time is charged to the dream line that called it
+EXCLUDED = {"generated.helpers"}
+HEAT_DIR = ".cache/heat"
+
+class LineSampler:
+    """Samples a thread's stack from a background thread and counts the lines of generated code it was on."""
+
+    def __init__(self, thread_id=None, hz=1000):
+        self.thread_id = thread_id or threading.main_thread().ident
+        self.interval = 1 / hz
+
+        self.lock = threading.Lock()
+        self.samples = 0
+        # samples that were in a dream at all, the shares are of these
+        self.hits = 0
+        # own is the innermost generated line, which is also charged for the helpers and pygame calls it made
+        self.own = Counter()
+        # total is every generated line on the stack, like cumulative time
+        self.total = Counter()
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.started = None
+        self.switch_interval = None
+
+    def start(self):
+        self.stop_event.clear()
+        self.started = time.perf_counter()
+        # a busy thread only hands the gil over after the switch interval, 5 ms by default, so without this the rate
+        # would be capped well under 1 khz and anything quicker than the interval would never be seen, only the sleeps after it
+        self.switch_interval = sys.getswitchinterval()
+        sys.setswitchinterval(min(self.switch_interval, self.interval / 2))
+        self.thread = threading.Thread(target=self._run, name="line sampler", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread:
+            self.thread.join()
+            self.thread = None
+            sys.setswitchinterval(self.switch_interval)
+
+    def _run(self):
+        # on a schedule rather than a fixed sleep, so the wait for the gil doesn't halve the rate
+        next_sample = time.perf_counter()
+        while True:
+            next_sample = max(next_sample + self.interval, time.perf_counter())
+            if self.stop_event.wait(next_sample - time.perf_counter()):
+                return
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                return
+            lines = []
+            while frame is not None:
+                # by module rather than file, dreams can come from generated/, the lineage store or a candidate
+                module = frame.f_globals.get("__name__", "")
+                if module.startswith(PACKAGE) and module not in EXCLUDED:
+                    lines.append((frame.f_code.co_filename, frame.f_lineno))
+                frame = frame.f_back
+            with self.lock:
+                self.samples += 1
+                if lines:
+                    self.hits += 1
+                    self.own[lines[0]] += 1
+                    # a recursive line is only counted once a sample
+                    self.total.update(set(lines))
+
+    def snapshot(self):
+        with self.lock:
+            return self.samples, self.hits, Counter(self.own), Counter(self.total)
+
+    def reset(self):
+        with self.lock:
+            self.samples = 0
+            self.hits = 0
+            self.own.clear()
+            self.total.clear()
+
+    def hottest(self, n=10):
+        _, hits, own, _ = self.snapshot()
+        return [(filename, line, count / max(1, hits)) for (filename, line), count in own.most_common(n)]
+
+    def annotate(self, filename):
+        # the source with the share of dream samples on each line, own then total
+        samples, hits, own, total = self.snapshot()
+        out = ["%d samples in %.1f s, %d of them in dreams, %s" % (samples, time.perf_counter() - self.started, hits, filename), "   own  total"]
+        hits = max(1, hits)
+        for line, text in enumerate(linecache.getlines(filename), 1):
+            key = (filename, line)
+            if key in total:
+                out.append("%5.1f%% %5.1f%% %4d  %s" % (100 * own[key] / hits, 100 * total[key] / hits, line, text.rstrip()))
+            else:
+                out.append("             %4d  %s" % (line, text.rstrip()))
+        return "\n".join(out) + "\n"
+
+    def write(self, directory=HEAT_DIR):
+        # one annotated file a program, for every program that was sampled
+        os.makedirs(directory, exist_ok=True)
+        paths = []
+        for filename in {f for f, _ in self.snapshot()[3]}:
+            path = os.path.join(directory, os.path.basename(filename)[:-3] + ".txt")
+            with open(path, "w") as f:
+                f.write(self.annotate(filename))
+            paths.append(path)
+        return paths
+
+    def print_hottest(self, n=10):
+        for filename, line, share in self.hottest(n):
+            print("%5.1f%%  %s:%d  %s" % (100 * share, os.path.basename(filename), line, linecache.getline(filename, line).strip()))
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a saved dream headless while sampling it, and print its source annotated with where the time went.")
+    parser.add_argument("name")
+    parser.add_argument("--seconds", type=float, default=10, help="seconds of the dream's time, played as fast as it goes")
+    parser.add_argument("--hz", type=int, default=1000)
+    args = parser.parse_args()
+
+    import headless
+    headless.init()
+    program = headless.load_program(args.name)
+    sampler = LineSampler(hz=args.hz)
+    sampler.start()
+    start = time.perf_counter()
+    headless.run_program(program, args.seconds)
+    elapsed = time.perf_counter() - start
+    sampler.stop()
+
+    print(sampler.annotate(sys.modules[PACKAGE + args.name].__file__))
+    print("%d samples, %.0f a second" % (sampler.samples, sampler.samples / elapsed))
+    sampler.print_hottest()
+
+if __name__ == "__main__":
+    main()
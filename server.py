@@ -0,0 +1,376 @@
+import os
+import json
+import time
+import queue
+import struct
+import asyncio
+import argparse
+import itertools
+import threading
+import traceback
+import multiprocessing
+from collections import deque
+from http import HTTPStatus
+from urllib.parse import parse_qs
+import numpy as np
+from websockets.asyncio.server import serve
+from websockets.exceptions import ConnectionClosed
+
+import codec
+import headless
+from generated.helpers import Render, Input, context_of
+from util import DiskUtil
+
+def run_worker(conn, fps, server_pid, step_limit=1):
+    # plays every session the server gives this process, one context each
+    # a dream that hangs its load or a frame past the step limit is dropped, so it can't freeze the others on this worker
+    headless.init()
+    sessions = {}
+    last = time.perf_counter()
+    while os.getppid() == server_pid:
+        start = time.perf_counter()
+        dt = start - last
+        last = start
+
+        while conn.poll():
+            message = conn.recv()
+            command, session_id = message[0], message[1]
+            if command == "start":
+                try:
+                    with headless.wall_alarm(step_limit):
+                        program = headless.load_program(message[2])
+                    sessions[session_id] = {"program": program, "previous": None, "cpu_s": 0.0}
+                except Exception as e:
+                    traceback.print_exc()
+                    conn.send(("error", session_id, repr(e)))
+            elif session_id not in sessions:
+                continue
+            elif command == "key":
+                with context_of(sessions[session_id]["program"]):
+                    if message[2]:
+                        Input.key_down(message[3])
+                    else:
+                        Input.key_up(message[3])
+            elif command == "key_frame":
+                sessions[session_id]["previous"] = None
+            elif command == "stop":
+                del sessions[session_id]
+
+        for session_id, session in list(sessions.items()):
+            cpu = time.thread_time()
+            program = session["program"]
+            try:
+                with headless.wall_alarm(step_limit), context_of(program) as context:
+                    Render.clear_screen()
+                    program.update(dt)
+                    program.draw()
+            except Exception as e:
+                traceback.print_exc()
+                del sessions[session_id]
+                conn.send(("error", session_id, repr(e)))
+                continue
+
+            bits = codec.pack(context.screen)
+            data = None
+            if session["previous"] is None or not np.array_equal(bits, session["previous"]):
+                data = codec.encode(bits, session["previous"])
+                session["previous"] = bits
+            session["cpu_s"] += time.thread_time() - cpu
+            # an unchanged frame still reports cpu time, it just has nothing to send
+            conn.send(("frame", session_id, data, session["cpu_s"], time.time()))
+
+        time.sleep(max(0.001, 1 / fps - (time.perf_counter() - start)))
+
+class Session:
+
+    def __init__(self, session_id, dream, websocket, worker, timing=False):
+        self.id = session_id
+        self.dream = dream
+        self.websocket = websocket
+        self.worker = worker
+        self.timing = timing
+
+        self.queue = deque()
+        self.ready = asyncio.Event()
+        self.awaiting_key_frame = False
+        self.error = None
+
+        self.started = time.monotonic()
+        self.produced = 0
+        self.sent = 0
+        self.dropped = 0
+        self.key_frames_requested = 0
+        self.bytes_sent = 0
+        self.cpu_s = 0.0
+        self.latencies = deque(maxlen=500)
+
+    def stats(self):
+        elapsed = max(1e-6, time.monotonic() - self.started)
+        latencies = sorted(self.latencies)
+        percentile = lambda p: round(1000 * latencies[min(len(latencies) - 1, len(latencies) * p // 100)], 2) if latencies else None
+        return {
+            "id": self.id,
+            "dream": self.dream,
+            "seconds": round(elapsed, 1),
+            "fps": round(self.sent / elapsed, 1),
+            "produced": self.produced,
+            "sent": self.sent,
+            "cpu_s": round(self.cpu_s, 3),
+            "cpu_percent": round(100 * self.cpu_s / elapsed, 1),
+            "kbps": round(self.bytes_sent * 8 / 1000 / elapsed, 1),
+            "queued": len(self.queue),
+            "dropped": self.dropped,
+            "key_frames_requested": self.key_frames_requested,
+            "latency_ms_p50": percentile(50),
+            "latency_ms_p95": percentile(95),
+        }
+
+class StreamServer:
+    """Streams dreams to browsers, each session played in one of a few worker processes."""
+
+    def __init__(self, workers, fps=30, max_sessions=256, max_queue=4):
+        self.fps = fps
+        self.max_sessions = max_sessions
+        self.max_queue = max_queue
+        self.dreams = set(DiskUtil.get_saved_program_names()) | {"mesh"}
+
+        context = multiprocessing.get_context("spawn")
+        self.workers = []
+        for _ in range(workers):
+            conn, child_conn = context.Pipe()
+            process = context.Process(target=run_worker, args=(child_conn, fps, os.getpid()), daemon=True)
+            process.start()
+            worker = {"conn": conn, "process": process, "sessions": 0, "outbox": queue.SimpleQueue()}
+            threading.Thread(target=self._write, args=(worker,), name="worker writer", daemon=True).start()
+            self.workers.append(worker)
+
+        self.sessions = {}
+        self.ids = itertools.count()
+
+    def start_readers(self, loop):
+        # the pipes are read and written on threads, loop.add_reader only exists on selector loops and a worker
+        # that falls behind would otherwise block every client on a full pipe
+        for worker in self.workers:
+            threading.Thread(target=self._read, args=(loop, worker), name="worker reader", daemon=True).start()
+
+    def _read(self, loop, worker):
+        while True:
+            try:
+                message = worker["conn"].recv()
+            except (EOFError, OSError):
+                return
+            loop.call_soon_threadsafe(self._receive, worker, message)
+
+    def _write(self, worker):
+        while True:
+            message = worker["outbox"].get()
+            if message is None:
+                return
+            try:
+                worker["conn"].send(message)
+            except OSError:
+                return
+
+    def _send(self, worker, message):
+        worker["outbox"].put(message)
+
+    def _receive(self, worker, message):
+        session = self.sessions.get(message[1])
+        if session is None:
+            return
+        if message[0] == "error":
+            session.error = message[2]
+            session.ready.set()
+            return
+
+        _, _, data, session.cpu_s, produced_at = message
+        if data is None:
+            return
+        session.produced += 1
+        if session.awaiting_key_frame:
+            if not codec.is_key_frame(data):
+                session.dropped += 1
+                return
+            session.awaiting_key_frame = False
+
+        session.queue.append((data, produced_at))
+        if len(session.queue) > self.max_queue:
+            # the client can't keep up, skip ahead to a fresh key frame instead of growing the backlog
+            session.dropped += len(session.queue)
+            session.queue.clear()
+            session.awaiting_key_frame = True
+            session.key_frames_requested += 1
+            self._send(worker, ("key_frame", session.id))
+        session.ready.set()
+
+    async def _send_frames(self, session):
+        while True:
+            await session.ready.wait()
+            session.ready.clear()
+            if session.error:
+                await session.websocket.close(1011, session.error[:120])
+                return
+            while session.queue:
+                data, produced_at = session.queue.popleft()
+                if session.timing:
+                    # the load tester runs on the same clock and measures delivery from this
+                    data = struct.pack("<d", produced_at) + data
+                # waits while the socket's write buffer is full, which is what lets the queue build up
+                await session.websocket.send(data)
+                session.sent += 1
+                session.bytes_sent += len(data)
+                session.latencies.append(time.time() - produced_at)
+
+    async def handle(self, websocket):
+        query = parse_qs(websocket.request.path.partition("?")[2])
+        dream = query.get("dream", ["mesh"])[0]
+        if dream not in self.dreams:
+            await websocket.close(1008, "no dream called " + dream[:60])
+            return
+        if len(self.sessions) >= self.max_sessions:
+            await websocket.close(1013, "server full")
+            return
+
+        worker = min(self.workers, key=lambda w: w["sessions"])
+        session = Session(next(self.ids), dream, websocket, worker, query.get("timing") == ["1"])
+        self.sessions[session.id] = session
+        worker["sessions"] += 1
+        self._send(worker, ("start", session.id, dream))
+        sender = asyncio.create_task(self._send_frames(session))
+        try:
+            async for message in websocket:
+                event = json.loads(message)
+                key = str(event.get("key", ""))[:16]
+                if key:
+                    self._send(worker, ("key", session.id, event.get("type") == "down", key))
+        except (ConnectionClosed, ValueError):
+            pass
+        finally:
+            sender.cancel()
+            self._send(worker, ("stop", session.id))
+            worker["sessions"] -= 1
+            del self.sessions[session.id]
+
+    def stats(self):
+        sessions = [s.stats() for s in self.sessions.values()]
+        return {
+            "sessions": len(sessions),
+            "workers": [{"pid": w["process"].pid, "sessions": w["sessions"]} for w in self.workers],
+            "cpu_percent": round(sum(s["cpu_percent"] for s in sessions), 1),
+            "queued": sum(s["queued"] for s in sessions),
+            "dropped": sum(s["dropped"] for s in sessions),
+            "session_stats": sessions,
+        }
+
+    def process_request(self, connection, request):
+        path = request.path.partition("?")[0]
+        if path == "/ws":
+            return None
+        if path == "/":
+            body, content_type = PAGE, "text/html; charset=utf-8"
+        elif path == "/dreams":
+            body, content_type = json.dumps(sorted(self.dreams)), "application/json"
+        elif path == "/stats":
+            body, content_type = json.dumps(self.stats(), indent=1), "application/json"
+        else:
+            return connection.respond(HTTPStatus.NOT_FOUND, "not found\n")
+        response = connection.respond(HTTPStatus.OK, body)
+        response.headers["Content-Type"] = content_type
+        return response
+
+    def shutdown(self):
+        for worker in self.workers:
+            worker["outbox"].put(None)
+            worker["process"].terminate()
+
+PAGE = """<!doctype html>
+<title>Robot Dreams</title>
+<style>
+body { background: #000; color: #fff; font-family: monospace; }
+canvas { width: 800px; height: 600px; image-rendering: pixelated; border: 1px solid #fff; display: block; margin-top: 8px; }
+</style>
+<select id="dream"></select> <span id="status"></span>
+<canvas id="screen" width="400" height="300" tabindex="0"></canvas>
+<script>
+const W = 400, H = 300;
+const KEYS = {" ": "space", "ArrowUp": "up", "ArrowDown": "down", "ArrowLeft": "left", "ArrowRight": "right",
+              "Enter": "return", "Backspace": "backspace", "Escape": "escape", "Tab": "tab", "Shift": "left shift"};
+const canvas = document.getElementById("screen"), select = document.getElementById("dream"), status = document.getElementById("status");
+const ctx = canvas.getContext("2d"), image = ctx.createImageData(W, H);
+let bits = new Uint8Array(W * H / 8), socket = null;
+
+function decode(buffer) {
+  // codec.py: kind, frame length, run count, then every skip, every run length, and the run bytes
+  const view = new DataView(buffer), kind = view.getUint8(0), runs = view.getUint32(5, true);
+  const bytes = new Uint8Array(buffer);
+  if (kind === 0) bits = new Uint8Array(view.getUint32(1, true));
+  let at = 0, literal = 9 + 8 * runs;
+  for (let r = 0; r < runs; r++) {
+    at += view.getUint32(9 + 4 * r, true);
+    const count = view.getUint32(9 + 4 * runs + 4 * r, true);
+    for (let end = at + count; at < end; at++) bits[at] ^= bytes[literal++];
+  }
+}
+
+function show() {
+  for (let i = 0; i < W * H; i++) {
+    const v = (bits[i >> 3] >> (7 - (i & 7))) & 1 ? 255 : 0;
+    image.data[i * 4] = image.data[i * 4 + 1] = image.data[i * 4 + 2] = v;
+    image.data[i * 4 + 3] = 255;
+  }
+  ctx.putImageData(image, 0, 0);
+}
+
+function play(name) {
+  if (socket) socket.close();
+  const ws = socket = new WebSocket(`ws://${location.host}/ws?dream=${encodeURIComponent(name)}`);
+  ws.binaryType = "arraybuffer";
+  ws.onopen = () => { status.textContent = "dreaming " + name; canvas.focus(); };
+  ws.onclose = (e) => { if (ws === socket) status.textContent = e.reason || "disconnected"; };
+  ws.onmessage = (e) => { decode(e.data); show(); };
+}
+
+for (const type of ["keydown", "keyup"]) {
+  canvas.addEventListener(type, (e) => {
+    e.preventDefault();
+    if (e.repeat || !socket || socket.readyState !== 1) return;
+    socket.send(JSON.stringify({type: type === "keydown" ? "down" : "up", key: KEYS[e.key] || e.key.toLowerCase()}));
+  });
+}
+
+fetch("/dreams").then((r) => r.json()).then((names) => {
+  for (const name of names) select.add(new Option(name, name, false, name === "mesh"));
+  select.onchange = () => play(select.value);
+  play(select.value);
+});
+</script>
+"""
+
+async def serve_forever(args):
+    server = StreamServer(args.workers, args.fps, args.max_sessions, args.max_queue)
+    server.start_readers(asyncio.get_running_loop())
+    try:
+        async with serve(server.handle, args.host, args.port, process_request=server.process_request, max_size=1024):
+            print("serving dreams on http://" + args.host + ":" + str(args.port))
+            while True:
+                await asyncio.sleep(args.report_every)
+                stats = server.stats()
+                print(time.strftime("%H:%M:%S"), stats["sessions"], "sessions,", str(stats["cpu_percent"]) + "% cpu,",
+                      stats["queued"], "frames queued,", stats["dropped"], "dropped")
+    finally:
+        server.shutdown()
+
+def main():
+    parser = argparse.ArgumentParser(description="Stream dreams to browsers over WebSocket.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="processes playing the sessions")
+    parser.add_argument("--fps", type=int, default=30, help="frames a second for every session")
+    parser.add_argument("--max-sessions", type=int, default=256)
+    parser.add_argument("--max-queue", type=int, default=4, help="frames waiting for a slow client before it skips to a key frame")
+    parser.add_argument("--report-every", type=float, default=10, help="seconds between stats lines, all of them are at /stats")
+    args = parser.parse_args()
+    asyncio.run(serve_forever(args))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+import os
+import sys
+import json
+import time
+import hashlib
+import argparse
+import logging
+import logging.handlers
+import threading
+from collections import defaultdict
+from pathlib import Path
+
+LOG_DIR = ".cache/telemetry"
+# every process's files together, the oldest are deleted when a new process starts logging
+MAX_LOG_BYTES = 50 * 1024 * 1024
+
+_logger = None
+_logger_lock = threading.Lock()
+
+def _get_logger():
+    global _logger
+    if _logger is None:
+        with _logger_lock:
+            logger = logging.getLogger("robot_dreams.telemetry")
+            if not logger.handlers:
+                os.makedirs(LOG_DIR, exist_ok=True)
+                prune()
+                # a file for every process, the app and a batch rotating one shared file would lose or mix up events
+                path = os.path.join(LOG_DIR, "llm-" + str(os.getpid()) + ".jsonl")
+                handler = logging.handlers.RotatingFileHandler(path, maxBytes=5 * 1024 * 1024, backupCount=5)
+                handler.setFormatter(logging.Formatter("%(message)s"))
+                logger.setLevel(logging.INFO)
+                logger.propagate = False
+                logger.addHandler(handler)
+            _logger = logger
+    return _logger
+
+def prune(directory=LOG_DIR, max_bytes=MAX_LOG_BYTES):
+    # rotation only bounds one process, this bounds all the runs before it
+    files = []
+    for p in Path(directory).glob("llm*.jsonl*"):
+        try:
+            stat = p.stat()
+        except OSError:
+            continue
+        files.append((stat.st_mtime, stat.st_size, p))
+    files.sort()
+
+    total = sum(size for _, size, _ in files)
+    for _, size, p in files:
+        if total <= max_bytes:
+            break
+        try:
+            p.unlink()
+        except OSError:
+            # another process may have pruned it first
+            pass
+        total -= size
+
+def prompt_hash(prompt):
+    return hashlib.sha1(prompt.encode()).hexdigest()[:12]
+
+def record(event, **fields):
+    fields["event"] = event
+    fields["time"] = time.time()
+    _get_logger().info(json.dumps(fields))
+
+def record_generation(model, prompt, name, response, validation, mode="full"):
+    usage = getattr(response, "usage_metadata", None)
+    record("generation",
+        model=model,
+        prompt_hash=prompt_hash(prompt),
+        name=name,
+        ttft_s=getattr(response, "ttft_s", None),
+        latency_s=getattr(response, "latency_s", None),
+        input_tokens=getattr(usage, "prompt_token_count", None),
+        output_tokens=getattr(usage, "candidates_token_count", None),
+        validation=validation,
+        mode=mode,
+    )
+
+def read_events(directory=LOG_DIR):
+    # every process's file and the files rotated out of it, merged back into one timeline
+    events = []
+    for p in Path(directory).glob("llm*.jsonl*"):
+        with open(p, "r") as f:
+            for line in f:
+                try:
+                    events.append(json.loads(line))
+                except ValueError:
+                    pass
+    events.sort(key=lambda e: e.get("time", 0))
+    return events
+
+def percentile(values, p):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+def summarize(events):
+    by_type = defaultdict(int)
+    for e in events:
+        by_type[e["event"]] += 1
+
+    generations = [e for e in events if e["event"] == "generation"]
+    summary = {
+        "events": dict(by_type),
+        "generations": len(generations),
+        "valid": sum(e["validation"] == "ok" for e in generations),
+        "input_tokens": sum(e["input_tokens"] or 0 for e in generations),
+        "output_tokens": sum(e["output_tokens"] or 0 for e in generations),
+    }
+    for key in ["ttft_s", "latency_s", "output_tokens"]:
+        values = [e[key] for e in generations if e.get(key) is not None]
+        summary[key + "_percentiles"] = {"p" + str(p): percentile(values, p) for p in (50, 90, 95, 99)}
+    return summary
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Query the LLM telemetry log.")
+    parser.add_argument("command", choices=["summary", "tail"], nargs="?", default="summary")
+    parser.add_argument("--hours", type=float, help="only events from the last N hours")
+    parser.add_argument("--model", help="only events for this model")
+    parser.add_argument("-n", type=int, default=20, help="events shown by tail")
+    args = parser.parse_args(argv)
+
+    events = read_events()
+    if args.hours:
+        since = time.time() - args.hours * 3600
+        events = [e for e in events if e["time"] >= since]
+    if args.model:
+        events = [e for e in events if e.get("model") == args.model]
+
+    if args.command == "summary":
+        print(json.dumps(summarize(events), indent=1))
+    else:
+        for e in events[-args.n:]:
+            print(json.dumps(e))
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
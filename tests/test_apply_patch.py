@@ -0,0 +1,75 @@
+import pytest
+
+from util import DiskUtil, PatchError
+
+PROGRAM = """class Program:
+    def __init__(self):
+        self.x = 0
+
+    def update(self, dt):
+        self.x += dt
+
+    def draw(self):
+        Render.clear_screen()
+"""
+
+def test_applies_a_hunk():
+    diff = """@@ -5,2 +5,2 @@
+     def update(self, dt):
+-        self.x += dt
++        self.x += 2 * dt
+"""
+    assert "self.x += 2 * dt\n" in DiskUtil.apply_patch(PROGRAM, diff)
+
+def test_line_numbers_off_by_a_few_still_apply():
+    diff = """```diff
+--- a/dream.py
++++ b/dream.py
+@@ -9,2 +9,3 @@
+     def update(self, dt):
+         self.x += dt
++        self.x %= 100
+```"""
+    patched = DiskUtil.apply_patch(PROGRAM, diff)
+    assert "        self.x += dt\n        self.x %= 100\n" in patched
+
+def test_hunks_apply_in_order_with_the_offset_of_earlier_ones():
+    diff = """@@ -2,2 +2,3 @@
+     def __init__(self):
+         self.x = 0
++        self.y = 0
+@@ -8,2 +9,3 @@
+     def draw(self):
+         Render.clear_screen()
++        Render.draw_rect(self.x, self.y, 1, 1)
+"""
+    patched = DiskUtil.apply_patch(PROGRAM, diff).splitlines()
+    assert patched[3] == "        self.y = 0"
+    assert patched[-1] == "        Render.draw_rect(self.x, self.y, 1, 1)"
+
+def test_blank_context_line_without_a_leading_space():
+    diff = """@@ -3,4 +3,4 @@
+         self.x = 0
+
+     def update(self, dt):
+-        self.x += dt
++        self.x -= dt
+"""
+    assert "self.x -= dt" in DiskUtil.apply_patch(PROGRAM, diff)
+
+def test_hunk_that_does_not_match_is_rejected():
+    diff = """@@ -5,2 +5,2 @@
+     def update(self, dt):
+-        self.x += speed
++        self.x += 2 * speed
+"""
+    with pytest.raises(PatchError, match="hunk at line 5"):
+        DiskUtil.apply_patch(PROGRAM, diff)
+
+def test_reply_without_hunks_is_rejected():
+    with pytest.raises(PatchError, match="no hunks"):
+        DiskUtil.apply_patch(PROGRAM, "Here is the updated program:\n-        self.x += dt\n+        self.x += 2 * dt\n")
+
+def test_malformed_hunk_header_is_rejected():
+    with pytest.raises(PatchError):
+        DiskUtil.apply_patch(PROGRAM, "@@ five @@\n-        self.x += dt\n+        self.x += 2 * dt\n")
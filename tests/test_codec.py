@@ -0,0 +1,41 @@
+import numpy as np
+
+import codec
+
+def frame(size, seed):
+    return codec.pack_bits(np.random.default_rng(seed).random(size) > 0.5)
+
+def test_key_frame_round_trip():
+    bits = frame(640 * 480, 0)
+    data = codec.encode(bits)
+    assert codec.is_key_frame(data)
+    assert np.array_equal(codec.decode(data), bits)
+
+def test_delta_round_trip():
+    previous = frame(640 * 480, 0)
+    bits = previous.copy()
+    bits[[3, 4, 10, 5000, 38399]] ^= 0xFF
+    data = codec.encode(bits, previous)
+    assert not codec.is_key_frame(data)
+    assert np.array_equal(codec.decode(data, previous), bits)
+
+def test_unchanged_delta_is_only_a_header():
+    bits = frame(640 * 480, 0)
+    data = codec.encode(bits, bits)
+    assert len(data) == codec.HEADER.size
+    assert np.array_equal(codec.decode(data, bits), bits)
+
+def test_frame_over_64k_round_trips():
+    # 1024x768 is 98304 bytes packed, more than a 16 bit length holds
+    bits = frame(1024 * 768, 1)
+    assert len(bits) > 65535
+    assert np.array_equal(codec.decode(codec.encode(bits)), bits)
+
+def test_long_run_and_skip_round_trip():
+    previous = np.zeros(1024 * 768 // 8 * 2, np.uint8)
+    bits = previous.copy()
+    # one run longer than 65535 bytes after a skip longer than that
+    bits[70000:140000] = 1
+    data = codec.encode(bits, previous)
+    assert np.array_equal(codec.decode(data, previous), bits)
+    assert np.array_equal(codec.decode(codec.encode(bits)), bits)
@@ -0,0 +1,49 @@
+import sys
+import importlib
+
+from lineage import KEYFRAME_INTERVAL, LineageFinder, LineageStore
+
+def revision_text(i):
+    # every revision changes, adds and drops a few lines of the one before
+    lines = ["VALUE = " + str(i) + "\n", "NAME = 'dream " + str(i) + "'\n"]
+    lines += ["LINE_" + str(j) + " = " + str(j * (i % 3)) + "\n" for j in range(i % 5, 30)]
+    lines += ["EXTRA_" + str(i) + " = True\n"] if i % 2 else []
+    return "".join(lines)
+
+def record_chain(store, count):
+    names = []
+    parent = None
+    for i in range(count):
+        name = "lineage_test_dream_" + str(i)
+        store.record(name, revision_text(i), parent, "prompt " + str(i))
+        names.append(name)
+        parent = name
+    return names
+
+def test_chain_longer_than_keyframe_interval_round_trips(tmp_path):
+    count = 2 * KEYFRAME_INTERVAL + 5
+    names = record_chain(LineageStore(tmp_path), count)
+
+    # a fresh store reads everything back from disk with nothing cached
+    store = LineageStore(tmp_path)
+    for i, name in enumerate(names):
+        assert store.materialize(name) == revision_text(i)
+
+    depths = [store.revisions[store.revision_of(n)]["depth"] for n in names]
+    assert max(depths) == KEYFRAME_INTERVAL - 1
+    assert depths.count(0) == 3
+    assert store.ancestry(names[-1]) == list(reversed(names))
+
+def test_import_hook_runs_the_materialized_source(tmp_path, monkeypatch):
+    store = LineageStore(tmp_path)
+    names = record_chain(store, KEYFRAME_INTERVAL + 3)
+    monkeypatch.setattr(sys, "meta_path", sys.meta_path + [LineageFinder(store)])
+
+    try:
+        for i, name in enumerate(names):
+            module = importlib.import_module("generated." + name)
+            assert module.VALUE == i
+            assert hasattr(module, "EXTRA_" + str(i)) == bool(i % 2)
+    finally:
+        for name in names:
+            sys.modules.pop("generated." + name, None)
@@ -0,0 +1,40 @@
+import cProfile
+import pstats
+
+from profiling import DreamProfiler, folded_stacks
+
+def leaf(n):
+    return sum(i * i for i in range(n))
+
+def branch():
+    return leaf(20000) + leaf(10000)
+
+def test_finish_without_frames_returns_none(tmp_path):
+    profiler = DreamProfiler(str(tmp_path))
+    profiler.start("nothing", 1)
+    assert profiler.finish() is None
+    assert not profiler.is_active()
+    assert not list(tmp_path.iterdir())
+
+def test_finish_writes_pstats_and_folded(tmp_path):
+    profiler = DreamProfiler(str(tmp_path))
+    profiler.start("branch", 60)
+    with profiler:
+        branch()
+    assert profiler.finish() == str(tmp_path / "branch.pstats")
+    assert all(line.startswith("branch (") for line in (tmp_path / "branch.folded").read_text().splitlines())
+
+def test_folded_stacks_follow_calls():
+    profile = cProfile.Profile()
+    profile.enable()
+    branch()
+    profile.disable()
+    stacks = {}
+    for line in folded_stacks(pstats.Stats(profile)):
+        stack, _, micros = line.rpartition(" ")
+        stacks[stack] = int(micros)
+
+    assert all(stack.startswith("branch (test_profiling.py") for stack in stacks)
+    leaves = [s for s in stacks if s.split(";")[-1].startswith("leaf ")]
+    assert len(leaves) == 1
+    assert any(s.startswith(leaves[0] + ";") for s in stacks)
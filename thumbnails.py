@@ -0,0 +1,157 @@
+import os
+import struct
+import hashlib
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+import pygame
+
+import codec
+import headless
+import lineage
+
+class ThumbnailCache:
+
+    def __init__(self, directory=".cache/thumbnails", seconds=3, workers=None):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.seconds = seconds
+
+        self.workers = workers
+        self.pool = headless.create_pool(workers)
+
+        self.keys = {}
+        self.stats = {}
+        self.futures = {}
+        # captures lost to a dead worker, retried one at a time so the dream that killed it is found
+        self.suspects = {}
+        self.isolated = None
+        self.bits = {}
+        self.surfaces = {}
+
+    def _source_key(self, name):
+        path = "generated/" + name + ".py"
+        if not os.path.exists(path):
+            # lineage revisions are already named by the hash of their source
+            return lineage.get_store().revision_of(name)
+
+        stat = os.stat(path)
+        stat = (stat.st_mtime_ns, stat.st_size)
+        if self.stats.get(name, (None,))[0] == stat:
+            return self.stats[name][1]
+
+        with open(path, "rb") as f:
+            key = hashlib.sha1(f.read()).hexdigest()
+        self.stats[name] = (stat, key)
+        return key
+
+    def _replace_pool(self):
+        # a worker that died mid capture breaks the whole pool, nothing more can be submitted to it
+        self.pool.shutdown(wait=False, cancel_futures=True)
+        self.pool = headless.create_pool(self.workers)
+
+    def _submit(self, key, name):
+        try:
+            future = self.pool.submit(headless.capture_thumbnail, name, self.seconds)
+        except BrokenProcessPool:
+            self._replace_pool()
+            future = self.pool.submit(headless.capture_thumbnail, name, self.seconds)
+        self.futures[key] = (name, future)
+
+    def _path(self, key):
+        return self.directory / (key + ".thumb")
+
+    def request(self, names):
+        for name in names:
+            key = self._source_key(name)
+            if self.keys.get(name) == key:
+                continue
+
+            self.keys[name] = key
+            self.bits.pop(name, None)
+            self.surfaces.pop(name, None)
+
+            path = self._path(key)
+            if path.exists():
+                self.bits[name] = self._read(path)
+            elif key in self.futures or key in self.suspects:
+                continue
+            elif self.suspects or self.isolated:
+                # while a worker killer is being looked for, new captures wait their turn behind it
+                self.suspects[key] = name
+            else:
+                self._submit(key, name)
+
+    def poll(self):
+        lost = {}
+        for key, (name, future) in list(self.futures.items()):
+            if not future.done():
+                continue
+
+            del self.futures[key]
+            try:
+                thumbnail = future.result()
+            except BrokenProcessPool:
+                lost[key] = name
+                continue
+            except Exception as e:
+                print("thumbnail failed for", name, e)
+                # an empty thumbnail stops us retrying until the source changes
+                thumbnail = (0, 0, b"")
+            self._store(key, name, thumbnail)
+
+        if lost:
+            # every capture still running went down with the pool
+            lost.update((key, name) for key, (name, _) in self.futures.items())
+            self.futures = {}
+            self._replace_pool()
+            if list(lost) == [self.isolated]:
+                print("thumbnail failed for", lost[self.isolated], "its worker died")
+                self._store(self.isolated, lost[self.isolated], (0, 0, b""))
+            else:
+                self.suspects.update(lost)
+
+        if not self.futures:
+            self.isolated = None
+            if self.suspects:
+                self.isolated = next(iter(self.suspects))
+                self._submit(self.isolated, self.suspects.pop(self.isolated))
+
+    def _store(self, key, name, thumbnail):
+        self._write(self._path(key), thumbnail)
+        if self.keys.get(name) == key:
+            self.bits[name] = thumbnail
+
+    def prune(self, names):
+        keep = {self._source_key(n) for n in names}
+        for path in self.directory.glob("*.thumb"):
+            if path.stem not in keep and path.stem not in self.futures and path.stem not in self.suspects:
+                path.unlink()
+
+    def get(self, name, size):
+        thumbnail = self.bits.get(name)
+        if not thumbnail or not thumbnail[0]:
+            return None
+
+        surfaces = self.surfaces.setdefault(name, {})
+        if size not in surfaces:
+            surfaces[size] = pygame.transform.scale(self._to_surface(thumbnail), size)
+        return surfaces[size]
+
+    def pending(self):
+        return bool(self.futures or self.suspects)
+
+    def shutdown(self):
+        self.pool.shutdown(cancel_futures=True)
+
+    def _to_surface(self, thumbnail):
+        w, h, data = thumbnail
+        return codec.to_surface(data, (w, h))
+
+    def _read(self, path):
+        data = path.read_bytes()
+        w, h = struct.unpack("<HH", data[:4])
+        return w, h, data[4:]
+
+    def _write(self, path, thumbnail):
+        w, h, data = thumbnail
+        path.write_bytes(struct.pack("<HH", w, h) + data)
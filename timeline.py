@@ -0,0 +1,79 @@
+import os
+import json
+import time
+import threading
+from collections import deque
+
+TRACE_DIR = ".cache/traces"
+
+# name, category, start and duration in ns, thread, args; the oldest fall off the end
+_spans = deque(maxlen=50000)
+
+class Span:
+    __slots__ = ("name", "category", "args", "start")
+
+    def __init__(self, name, category, args):
+        self.name = name
+        self.category = category
+        self.args = args
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        _spans.append((self.name, self.category, self.start, time.perf_counter_ns() - self.start, threading.get_ident(), self.args))
+
+def span(name, category="frame", **args):
+    return Span(name, category, args or None)
+
+def add(name, start_ns, end_ns, category="frame", **args):
+    _spans.append((name, category, start_ns, end_ns - start_ns, threading.get_ident(), args or None))
+
+def clear():
+    _spans.clear()
+
+def to_chrome_trace(spans=None):
+    # the format chrome://tracing and ui.perfetto.dev open, times in microseconds
+    spans = list(_spans) if spans is None else spans
+    pid = os.getpid()
+    threads = {t.ident: t.name for t in threading.enumerate()}
+    events = [{"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": threads.get(tid, str(tid))}}
+              for tid in {s[4] for s in spans}]
+    for name, category, start, duration, tid, args in spans:
+        event = {"name": name, "cat": category, "ph": "X", "ts": start / 1000, "dur": duration / 1000, "pid": pid, "tid": tid}
+        if args:
+            event["args"] = args
+        events.append(event)
+    return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+def _write(path, spans):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(to_chrome_trace(spans), f)
+
+def export(path=None, reason="manual", wait=False):
+    # the spans are copied here, writing them out happens off the frame so an export doesn't cause a hitch of its own
+    path = path or os.path.join(TRACE_DIR, time.strftime("%Y%m%d-%H%M%S") + "-" + reason + ".json")
+    writer = threading.Thread(target=_write, args=(path, list(_spans)), name="timeline export")
+    writer.start()
+    if wait:
+        writer.join()
+    return path
+
+class SpikeWatch:
+    """Exports the timeline when a frame takes longer than a limit, at most once per cooldown."""
+
+    def __init__(self, limit_ms, cooldown_s=10):
+        self.limit_ms = limit_ms
+        self.cooldown_s = cooldown_s
+        self.last_export = None
+
+    def check(self, frame_ms):
+        if not self.limit_ms or frame_ms < self.limit_ms:
+            return None
+        now = time.monotonic()
+        if self.last_export is not None and now - self.last_export < self.cooldown_s:
+            return None
+        self.last_export = now
+        return export(reason="spike")
@@ -1,4 +1,5 @@
 import pygame
+from collections import OrderedDict, defaultdict
 
 class Button:
 
@@ -10,10 +11,17 @@ class Button:
         self.hovered = False
         self.hover_loc = False
 
+        self.text_surf = None
+        self.text_key = None
+
     def draw(self, surface):
         pygame.draw.rect(surface, (255, 255, 255), self.rect, 0 if self.hovered else 1)
-        text_surf = self.font.render(self.text, False, (0, 0, 0) if self.hovered else (255, 255, 255))
-        surface.blit(text_surf, self.rect.topleft)
+        # only rendered again when the label or hover changes
+        key = (self.text, self.hovered)
+        if key != self.text_key:
+            self.text_key = key
+            self.text_surf = self.font.render(self.text, False, (0, 0, 0) if self.hovered else (255, 255, 255))
+        surface.blit(self.text_surf, self.rect.topleft)
 
     def check_hovered(self, mouse_pos):
         self.hovered = self.rect.collidepoint(mouse_pos)
@@ -29,10 +37,16 @@ class TextInput:
 
         self.focused = False
 
+        self.text_surf = None
+        self.text_key = None
+
     def draw(self, surface):
         pygame.draw.rect(surface, (255, 255, 255), self.rect, 0 if self.focused else 1)
-        text_surf = self.font.render(self.text if self.text or self.focused else self.empty_string, False, (0, 0, 0) if self.focused else (255, 255, 255))
-        surface.blit(text_surf, self.rect.topleft)
+        key = (self.text, self.focused)
+        if key != self.text_key:
+            self.text_key = key
+            self.text_surf = self.font.render(self.text if self.text or self.focused else self.empty_string, False, (0, 0, 0) if self.focused else (255, 255, 255))
+        surface.blit(self.text_surf, self.rect.topleft)
 
     def check_focused(self, mouse_pos):
         self.focused = self.rect.collidepoint(mouse_pos)
@@ -56,43 +70,151 @@ class TextInput:
             self.text += key_name
         return False
 
+class TrigramIndex:
+
+    def __init__(self, texts):
+        self.texts = [t.lower() for t in texts]
+        self.trigrams = defaultdict(set)
+        for i, text in enumerate(self.texts):
+            for j in range(len(text) - 2):
+                self.trigrams[text[j:j + 3]].add(i)
+
+    def search(self, query, candidates=None):
+        query = query.lower()
+        if candidates is None:
+            candidates = range(len(self.texts))
+
+        if len(query) >= 3:
+            hits = sorted((self.trigrams.get(query[j:j + 3], set()) for j in range(len(query) - 2)), key=len)
+            # narrowing an earlier result is cheaper than intersecting postings
+            if len(hits[0]) < len(candidates):
+                matches = hits[0].intersection(*hits[1:])
+                if not isinstance(candidates, range):
+                    matches.intersection_update(candidates)
+                candidates = sorted(matches)
+
+        return [i for i in candidates if query in self.texts[i]]
+
 class OptionMenu:
 
-    def __init__(self, rect, font, options):
+    def __init__(self, rect, font, options, thumbnails=None, thumbnail_size=(64, 48), cache_size=256):
         self.rect = rect
         self.font = font
         self.options = options
+        self.thumbnails = thumbnails
+        self.thumbnail_size = thumbnail_size
+        self.cache_size = cache_size
+
+        self.index = TrigramIndex(options)
+        self.query = ""
+        self.matches = list(range(len(options)))
+        self.text_cache = OrderedDict()
+        self.requested = set()
+
+        self.scroll = 0.0
+        self.target_scroll = 0.0
 
         self.surf = pygame.Surface(rect.size)
         self._build_surfaces()
         self._recalculate_hover()
 
     def _build_surfaces(self):
-        self.header_surf = self.font.render("Saved dreams:", False, (255, 255, 255))
-        self.options_surf = pygame.Surface((self.rect.width, self.header_surf.get_height() * (1 + len(self.options))))
-
-        y = 0
-        for option in self.options:
-            option_surf = self.font.render(option, False, (255, 255, 255))
-            self.options_surf.blit(option_surf, (0, y))
-            y += self.header_surf.get_height()
+        self.header_height = self.font.get_linesize()
+        self.row_height = self.header_height
+        self.text_x = 0
+        if self.thumbnails:
+            self.row_height = max(self.row_height, self.thumbnail_size[1] + 2)
+            self.text_x = self.thumbnail_size[0] + 5
+        self.text_y = (self.row_height - self.header_height) // 2
+        self.list_height = self.rect.height - self.header_height
+
+        self._build_header()
+
+    def _build_header(self):
+        header = "Saved dreams:"
+        if self.query:
+            header += " " + self.query + "_  (" + str(len(self.matches)) + ")"
+        else:
+            header += "  (type to search)"
+        self.header_surf = self.font.render(header, False, (255, 255, 255))
+
+    def _text_surf(self, text, inverted):
+        key = (text, inverted)
+        surf = self.text_cache.get(key)
+        if surf is None:
+            surf = self.font.render(text, False, (0, 0, 0) if inverted else (255, 255, 255))
+            self.text_cache[key] = surf
+            if len(self.text_cache) > self.cache_size:
+                self.text_cache.popitem(last=False)
+        else:
+            self.text_cache.move_to_end(key)
+        return surf
+
+    def _max_scroll(self):
+        return max(0, len(self.matches) * self.row_height - self.list_height)
+
+    def _scroll_to(self, target):
+        self.target_scroll = min(max(0, target), self._max_scroll())
+
+    def is_animating(self):
+        return self.scroll != self.target_scroll
+
+    def _visible_rows(self):
+        first = int(self.scroll) // self.row_height
+        last = min(len(self.matches), (int(self.scroll) + self.list_height) // self.row_height + 1)
+        return range(first, last)
 
     def draw(self, surface):
+        if self.is_animating():
+            self.scroll += (self.target_scroll - self.scroll) * 0.3
+            if abs(self.target_scroll - self.scroll) < 0.5:
+                self.scroll = self.target_scroll
+            self._recalculate_hover()
+
         self.surf.fill((0, 0, 0))
-        
-        self.surf.blit(self.options_surf, (0, self.header_surf.get_height()))
 
-        if self.hovered_option_i is not None:
-            hover_rect = pygame.Rect(0, self.header_surf.get_height() * (self.hovered_option_i + 1), self.rect.width, self.header_surf.get_height())
-            pygame.draw.rect(self.surf, (255, 255, 255), hover_rect)
-            hovered_option = self.font.render(self.options[self.hovered_option_i], False, (0, 0, 0))
-            self.surf.blit(hovered_option, hover_rect)
+        rows = self._visible_rows()
+        if self.thumbnails:
+            self._request_thumbnails(rows)
+
+        for row in rows:
+            option = self.options[self.matches[row]]
+            hovered = row == self.hovered_option_i
+            y = self.header_height + row * self.row_height - int(self.scroll)
+
+            if hovered:
+                pygame.draw.rect(self.surf, (255, 255, 255), (0, y, self.rect.width, self.row_height))
+            self.surf.blit(self._text_surf(option, hovered), (self.text_x, y + self.text_y))
 
-        pygame.draw.rect(self.surf, (0, 0, 0), (0, 0, self.rect.width, self.header_surf.get_height()))
+            if self.thumbnails:
+                self._draw_thumbnail(option, y + 1)
+
+        if self._max_scroll() > 0:
+            bar_height = max(20, self.list_height * self.list_height // (len(self.matches) * self.row_height))
+            bar_y = self.header_height + (self.list_height - bar_height) * self.scroll / self._max_scroll()
+            pygame.draw.rect(self.surf, (255, 255, 255), (self.rect.width - 4, bar_y, 4, bar_height))
+
+        pygame.draw.rect(self.surf, (0, 0, 0), (0, 0, self.rect.width, self.header_height))
         self.surf.blit(self.header_surf, (0, 0))
 
         surface.blit(self.surf, self.rect)
 
+    def _request_thumbnails(self, rows):
+        self.thumbnails.poll()
+
+        names = [self.options[self.matches[row]] for row in rows]
+        new_names = [n for n in names if n not in self.requested]
+        if new_names:
+            self.thumbnails.request(new_names)
+            self.requested.update(new_names)
+
+    def _draw_thumbnail(self, option, y):
+        thumbnail = self.thumbnails.get(option, self.thumbnail_size)
+        thumbnail_rect = pygame.Rect((0, y), self.thumbnail_size)
+        if thumbnail:
+            self.surf.blit(thumbnail, thumbnail_rect)
+        pygame.draw.rect(self.surf, (255, 255, 255), thumbnail_rect, 1)
+
     def _recalculate_hover(self):
         self.hovered_option_i = None
 
@@ -101,19 +223,57 @@ class OptionMenu:
         if not self.rect.collidepoint(pos):
             return
 
-        adjusted_y = pos[1] - self.rect.y - self.header_surf.get_height()
+        adjusted_y = pos[1] - self.rect.y - self.header_height
+        if adjusted_y < 0:
+            return
 
-        i = adjusted_y // self.header_surf.get_height()
-        if i >= 0 and i < len(self.options) and adjusted_y < self.rect.height:
+        i = (adjusted_y + int(self.scroll)) // self.row_height
+        if i < len(self.matches):
             self.hovered_option_i = i
 
+    def _set_query(self, query):
+        if query == self.query:
+            return
+
+        # typing more only ever narrows the current matches
+        candidates = self.matches if query.startswith(self.query) else None
+        self.query = query
+        self.matches = self.index.search(query, candidates)
+
+        self.scroll = self.target_scroll = 0.0
+        self._build_header()
+        self._recalculate_hover()
+
+    def _take_key(self, event):
+        key_name = pygame.key.name(event.key)
+        if key_name == 'backspace':
+            self._set_query(self.query[:-1])
+        elif key_name == 'escape':
+            self._set_query("")
+        elif key_name == 'space':
+            self._set_query(self.query + ' ')
+        elif key_name == 'page down':
+            self._scroll_to(self.target_scroll + self.list_height)
+        elif key_name == 'page up':
+            self._scroll_to(self.target_scroll - self.list_height)
+        elif key_name == 'home':
+            self._scroll_to(0)
+        elif key_name == 'end':
+            self._scroll_to(self._max_scroll())
+        elif len(key_name) == 1:
+            self._set_query(self.query + key_name)
+
     def handle_event(self, event):
         if event.type == pygame.MOUSEMOTION:
             self._recalculate_hover()
-        elif event.type == pygame.MOUSEBUTTONDOWN:
+        elif event.type == pygame.MOUSEWHEEL:
+            self._scroll_to(self.target_scroll - event.y * self.row_height * 2)
+        elif event.type == pygame.KEYDOWN:
+            self._take_key(event)
+        elif event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
             self._recalculate_hover()
             if self.hovered_option_i is not None:
-                return self.options[self.hovered_option_i]
+                return self.options[self.matches[self.hovered_option_i]]
 
         return None
 
@@ -1,8 +1,23 @@
+import re
+import sys
+import time
 import importlib
-from concurrent.futures import ThreadPoolExecutor
-from google.genai import types
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor, CancelledError, as_completed
 from pathlib import Path
 
+import lineage
+import telemetry
+from dream_chat import DreamChat
+from generated.helpers import create_program
+
+DEFAULT_MODEL = "gemini-2.5-flash"
+CANDIDATE_WALL_LIMIT = 5
+
+class PatchError(Exception):
+    pass
+
 class DiskUtil:
 
     def read_system_instructions():
@@ -17,50 +32,271 @@ class DiskUtil:
             string = f.read()
         return string
 
-    def write_program(name, text):
-        text = text.replace('```python', '')
-        text = text.replace('```', '')
-        with open("generated/" + name + ".py", 'w') as f:
-            f.write('import math\n')
-            f.write('import random\n')
-            f.write('from generated.helpers import Render, Input, Sound\n\n')
+    def strip_fences(text):
+        text = re.sub(r'```[a-z]*', '', text)
+        return text
+
+    def clean_program(text):
+        text = DiskUtil.strip_fences(text)
+        return 'import math\nimport random\nfrom generated.helpers import Render, Input, Sound\n\n' + text
+
+    def _parse_hunks(diff):
+        hunks = []
+        hunk = None
+        for line in DiskUtil.strip_fences(diff).splitlines():
+            header = re.match(r'@@ -(\d+)(?:,\d+)? \+\d+(?:,\d+)? @@', line)
+            if header:
+                hunk = (int(header.group(1)) - 1, [], [])
+                hunks.append(hunk)
+            elif hunk is None or line.startswith('\\'):
+                continue
+            elif line.startswith('---') or line.startswith('+++'):
+                hunk = None
+            elif line.startswith('-'):
+                hunk[1].append(line[1:])
+            elif line.startswith('+'):
+                hunk[2].append(line[1:])
+            else:
+                # models often drop the leading space on blank context lines
+                context = line[1:] if line.startswith(' ') else line
+                hunk[1].append(context)
+                hunk[2].append(context)
+        return hunks
+
+    def apply_patch(text, diff):
+        # line numbers are only a hint, each hunk is found by its context nearest to where it claims to be
+        lines = text.splitlines()
+        hunks = DiskUtil._parse_hunks(diff)
+        if not hunks:
+            raise PatchError("no hunks in reply")
 
-            f.write(text)
+        offset = 0
+        search_from = 0
+        for start, old, new in hunks:
+            hint = start + offset
+            stripped = [l.rstrip() for l in old]
+            positions = sorted(range(search_from, len(lines) - len(old) + 1), key=lambda i: abs(i - hint))
+            at = next((i for i in positions if [l.rstrip() for l in lines[i:i + len(old)]] == stripped), None)
+            if at is None:
+                raise PatchError("hunk at line " + str(start + 1) + " does not match the program")
+
+            lines[at:at + len(old)] = new
+            offset += len(new) - len(old)
+            search_from = at + len(new)
+        return "\n".join(lines) + "\n"
+
+    def write_program(name, text, parent=None, prompt=None):
+        text = DiskUtil.clean_program(text)
+
+        store = lineage.get_store()
+        if parent and not store.has(parent) and Path("generated/" + parent + ".py").is_file():
+            # older dreams live as plain files, bring the parent in so the child can be a delta
+            store.record(parent, DiskUtil.read_program(parent))
+        store.record(name, text, parent, prompt)
+
+    def read_program(name):
+        path = Path("generated/" + name + ".py")
+        if path.is_file():
+            return path.read_text()
+        return lineage.get_store().materialize(name)
 
     def get_saved_program_names():
         path = Path("generated")
 
         files = [f.name[:-3] for f in path.glob('*.py') if f.is_file() and f.name not in {'mesh.py', 'helpers.py', '__init__.py'}]
+        file_set = set(files)
+        files.extend(n for n in lineage.get_store().get_names() if n not in file_set)
         return files
 
 class LlmUtil:
 
     def load_local_program(name):
+        # installs the import hook for dreams kept in the lineage store
+        lineage.get_store()
         module = importlib.import_module("generated." + name)
-        return module.Program()
+        return create_program(module.Program)
 
     def load_default_program():
         return LlmUtil.load_local_program("mesh")
 
-    def load_new_program(chat, prompt, name):
+    def load_edited_program(chat, prompt, name, parent=None, cancel=None):
+        import headless
+
+        response = None
+        try:
+            print("loading edit, request: ", prompt)
+            response = chat.send_edit(prompt, cancel)
+            text = DiskUtil.apply_patch(DiskUtil.strip_fences(chat.latest_program), response.text)
+            source = DiskUtil.clean_program(text)
+            problems = headless.check_source(source)
+            if problems:
+                raise PatchError("; ".join(problems))
+            # built from the source first, an edit that doesn't import or construct leaves the chat and the lineage as they were
+            headless.load_program(name, source)
+
+            chat.record(prompt, text)
+            DiskUtil.write_program(name, text, parent, prompt)
+            module = importlib.import_module("generated." + name)
+            program = create_program(module.Program)
+            telemetry.record_generation(chat.model, prompt, name, response, "ok", "edit")
+            return program
+        except CancelledError:
+            raise
+        except Exception as e:
+            traceback.print_exc()
+            sys.modules.pop("generated." + name, None)
+            telemetry.record_generation(chat.model, prompt, name, response, repr(e), "edit")
+            return None
+
+    def load_new_program(chat, prompt, name, parent=None, cancel=None, edit=False):
+        if edit and chat.latest_program is not None:
+            # small changes come back as a diff, anything that doesn't apply and validate is regenerated whole
+            program = LlmUtil.load_edited_program(chat, prompt, name, parent, cancel)
+            if program is not None:
+                return program
+
+        response = None
         try:
             print("loading program, request: ", prompt)
-            response = chat.send_message(prompt)
-            print(response)
-            DiskUtil.write_program(name, response.text)
+            response = chat.send_message(prompt, cancel)
+            DiskUtil.write_program(name, response.text, parent, prompt)
             module = importlib.import_module("generated." + name)
-            return module.Program()
-        except:
-            import traceback
+            program = create_program(module.Program)
+            telemetry.record_generation(chat.model, prompt, name, response, "ok")
+            return program
+        except Exception as e:
+            traceback.print_exc()
+            telemetry.record_generation(chat.model, prompt, name, response, repr(e))
+            return LlmUtil.load_default_program()
+
+    def describe_error(e, name):
+        # the exception and the line of the dream it came from
+        frames = [f for f in traceback.extract_tb(e.__traceback__) if f.filename.endswith(name + ".py")]
+        line = e.lineno if isinstance(e, SyntaxError) else frames[-1].lineno if frames else None
+        return {"error": "".join(traceback.format_exception_only(type(e), e)).strip(), "line": line}
+
+    def repair_prompt(failure, source, context=4):
+        prompt = "Your program crashed with " + failure["error"] + "."
+        if failure["line"]:
+            lines = source.splitlines()
+            i = failure["line"] - 1
+            around = [(">> " if j == i else "   ") + lines[j] for j in range(max(0, i - context), min(len(lines), i + context + 1))]
+            prompt += " It failed on the line marked >>:\n" + "\n".join(around) + "\n"
+        return prompt + "\nFix the bug and change nothing else."
+
+    def repair_program(chat, prompt, name, parent, validators, edit=True, cancel=None):
+        # the fix runs headless first, the chat and the lineage only keep it if it survives
+        import headless
+
+        response = None
+        try:
+            print("repairing program, request: ", prompt)
+            if edit:
+                response = chat.send_edit(prompt, cancel)
+                text = DiskUtil.apply_patch(DiskUtil.strip_fences(chat.latest_program), response.text)
+            else:
+                response = chat.fork().send_message(prompt, cancel)
+                text = response.text
+            validation = headless.validate_in(validators, name, 2, 10, DiskUtil.clean_program(text))
+        except CancelledError:
+            raise
+        except Exception as e:
+            traceback.print_exc()
+            validation = {"ok": False, "error": repr(e)}
+        if cancel is not None and cancel.is_set():
+            raise CancelledError()
+
+        telemetry.record_generation(chat.model, prompt, name, response, "ok" if validation["ok"] else validation["error"], "repair")
+        if validation["ok"]:
+            chat.record(prompt, text)
+            DiskUtil.write_program(name, text, parent, prompt)
+        return validation["ok"]
+
+    def _generate_candidate(chat, prompt, name, cancel, validators, frame_budget_ms):
+        import headless
+
+        try:
+            response = chat.send_message(prompt, cancel)
+        except CancelledError:
+            return False
+        except Exception as e:
+            traceback.print_exc()
+            telemetry.record_generation(chat.model, prompt, name, None, repr(e))
+            return False
+        if cancel.is_set():
+            return False
+
+        source = DiskUtil.clean_program(response.text)
+        validation = headless.validate_in(validators, name, 1, CANDIDATE_WALL_LIMIT, source)
+        if validation["ok"] and validation["frame_ms"] > frame_budget_ms:
+            validation["ok"] = False
+            validation["error"] = "too slow, %.1f ms a frame" % validation["frame_ms"]
+        telemetry.record_generation(chat.model, prompt, name, response, "ok" if validation["ok"] else validation["error"])
+        return validation["ok"]
+
+    def load_best_program(chat, prompt, name, parent, candidates, validators, frame_budget_ms=1000 / 60, cancel=None):
+        # every candidate dreams on its own fork of the chat, the first one to validate wins
+        print("loading program from", candidates, "candidates, request: ", prompt)
+        start = time.perf_counter()
+        cancel = cancel or threading.Event()
+        pool = ThreadPoolExecutor(max_workers=candidates)
+        futures = {}
+        for i in range(candidates):
+            fork = chat.fork()
+            futures[pool.submit(LlmUtil._generate_candidate, fork, prompt, name + "_" + str(i), cancel, validators, frame_budget_ms)] = fork
+
+        winner = None
+        for future in as_completed(futures):
+            try:
+                won = future.result()
+            except Exception:
+                # one candidate failing badly is just one fewer candidate
+                traceback.print_exc()
+                won = False
+            if won:
+                winner = futures[future]
+                break
+        cancel.set()
+        pool.shutdown(wait=False, cancel_futures=True)
+        telemetry.record("race", candidates=candidates, won=winner is not None, latency_s=time.perf_counter() - start)
+
+        if winner is None:
+            return LlmUtil.load_default_program()
+
+        chat.adopt(winner)
+        DiskUtil.write_program(name, winner.latest_program, parent, prompt)
+        try:
+            return LlmUtil.load_local_program(name)
+        except Exception:
             traceback.print_exc()
             return LlmUtil.load_default_program()
 
-    def create_new_chat(client, system_instructions, model="gemini-2.5-flash"):
-        return client.chats.create(model=model, config=types.GenerateContentConfig(system_instruction=system_instructions))
+    def create_client(spec="gemini", timeout=None):
+        # "fake" or "fake:ttft=0.5,error_rate=0.1" serves the saved dreams without a network
+        if spec.startswith("fake"):
+            from fake_llm import FakeClient, parse_spec
+            return FakeClient(timeout=timeout, **parse_spec(spec))
+        from google import genai
+        from google.genai import types
+        from llm_client import on_response
+        # the hook lets a cancelled or beaten stream drop its connection while it waits for a chunk
+        options = types.HttpOptions(client_args={"event_hooks": {"response": [on_response]}})
+        if timeout:
+            # bounds every read, so a stalled connection can't outlive the request deadline
+            options.timeout = int(timeout * 1000)
+        return genai.Client(http_options=options)
+
+    def create_new_chat(llm, system_instructions, model=DEFAULT_MODEL):
+        return DreamChat(llm, model, system_instructions)
+
+    def load_new_program_async(chat, prompt, name, parent=None, cancel=None, edit=False):
+        executor = ThreadPoolExecutor(max_workers=1)
+        return executor.submit(LlmUtil.load_new_program, chat, prompt, name, parent, cancel, edit)
+
+    def load_best_program_async(chat, prompt, name, parent, candidates, validators, cancel=None):
+        executor = ThreadPoolExecutor(max_workers=1)
+        return executor.submit(LlmUtil.load_best_program, chat, prompt, name, parent, candidates, validators, cancel=cancel)
 
-    def load_new_program_async(chat, prompt, name):
+    def repair_program_async(chat, prompt, name, parent, validators, edit=True, cancel=None):
         executor = ThreadPoolExecutor(max_workers=1)
-        return executor.submit(LlmUtil.load_new_program, chat, prompt, name)
-        
-        
-        
\ No newline at end of file
+        return executor.submit(LlmUtil.repair_program, chat, prompt, name, parent, validators, edit, cancel)